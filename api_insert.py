@@ -1,33 +1,107 @@
 #!/usr/bin/env python3
 """
-Insert data into Milvus cloud database using REST API
+Insert data into Milvus cloud database.
+
+Bulk loads from the local vector database go through pymilvus' gRPC client
+(load_data_to_cloud.py), which sends vectors as packed float32; the REST API
+is kept as a fallback when pymilvus or MILVUS_URI is unavailable.
 """
 import requests
 import json
 import os
+import gzip
+import orjson
+import ijson
+import numpy as np
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def insert_data_via_api():
-    """Insert data using Milvus REST API"""
+# Connection settings, read once at import
+_TOKEN = os.getenv("MILVUS_TOKEN")
+_URL = os.getenv("MILVUS_API_URL", "https://in03-a39eed178c34f1b.serverless.aws-eu-central-1.cloud.zilliz.com/v2/vectordb/entities/insert")
+_HEADERS = {
+    "Authorization": f"Bearer {_TOKEN}",
+    "Content-Type": "application/json"
+}
+
+# Gzip request bodies; float-array JSON compresses several times over
+_GZIP = os.getenv("MILVUS_API_GZIP", "true").lower() == "true"
+if _GZIP:
+    _HEADERS["Content-Encoding"] = "gzip"
+
+# Documents posted per insert request
+BATCH_SIZE = 256
+
+# Insert requests in flight at once
+MAX_WORKERS = 8
+
+def _create_session() -> requests.Session:
+    """Create an HTTP session that keeps pooled connections alive between requests"""
+    session = requests.Session()
+    # Retry POSTs only on statuses where the server did not apply the insert
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"POST"})
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def _encode_body(payload: dict, option: int = 0) -> bytes:
+    """Serialize a request payload once, gzip-compressed when enabled"""
+    body = orjson.dumps(payload, option=option)
+    return gzip.compress(body, compresslevel=3) if _GZIP else body
+
+def _post_batch(session: requests.Session, url: str, headers: dict, batch: list) -> int:
+    """Post one batch of documents and return the number inserted"""
+    # Keep the batch embeddings in one float32 block; orjson serializes the rows natively
+    embeddings = np.asarray([doc['embedding'] for doc in batch], dtype=np.float32)
     
-    # API endpoint
-    # url = "https://in03-a39eed178c34f1b.serverless.aws-eu-central-1.cloud.zilliz.com/v2/vectordb/entities/insert"
-    url = os.getenv("MILVUS_API_URL", "https://in03-a39eed178c34f1b.serverless.aws-eu-central-1.cloud.zilliz.com/v2/vectordb/entities/insert")
-    # Headers
-    headers = {
-        "Authorization": f"Bearer {os.getenv('MILVUS_TOKEN')}",
-        "Content-Type": "application/json"
+    api_data = {
+        "collectionName": "ecom",
+        "data": [
+            {
+                "embedding": embeddings[i],
+                "text": doc['text'],
+                "metadata": doc['metadata']
+            }
+            for i, doc in enumerate(batch)
+        ]
     }
     
+    # Serialize once and send the pre-encoded body
+    body = _encode_body(api_data, option=orjson.OPT_SERIALIZE_NUMPY)
+    response = session.post(url, headers=headers, data=body, timeout=60)
+    
+    print(f"📡 Response Status: {response.status_code} ({len(batch)} documents)")
+    if response.status_code != 200:
+        raise RuntimeError(f"insert failed with {response.status_code}: {response.text}")
+    
+    return len(batch)
+
+# Placeholder 384-dimensional embeddings for the sample documents
+_VEC01 = [0.1] * 384
+_VEC02 = [0.2] * 384
+_VEC03 = [0.3] * 384
+
+def insert_data_via_api():
+    """Insert data using Milvus REST API"""
+    
     # Sample data to insert
     sample_data = {
         "collectionName": "ecom",
         "data": [
             {
-                "embedding": [0.1] * 384,  # 384-dimensional embedding
+                "embedding": _VEC01,
                 "text": "Our return policy allows customers to return items within 30 days of purchase. All items must be in original condition with tags attached. Refunds will be processed within 5-7 business days after we receive the returned item.",
                 "metadata": {
                     "filename": "return_policy.pdf",
@@ -37,7 +111,7 @@ def insert_data_via_api():
                 }
             },
             {
-                "embedding": [0.2] * 384,  # 384-dimensional embedding
+                "embedding": _VEC02,
                 "text": "We offer several shipping options: Standard shipping (5-7 business days) for $5.99, Express shipping (2-3 business days) for $12.99, and Overnight shipping (1 business day) for $24.99. Free standard shipping is available on orders over $50.",
                 "metadata": {
                     "filename": "shipping_guide.pdf",
@@ -47,7 +121,7 @@ def insert_data_via_api():
                 }
             },
             {
-                "embedding": [0.3] * 384,  # 384-dimensional embedding
+                "embedding": _VEC03,
                 "text": "Return Shipping Costs: For defective, damaged, or incorrect items shipped to you, we provide a free return shipping label. For returns due to personal preference, wrong size selection, or change of mind, customers are responsible for return shipping costs, which are $5.99 via ground service.",
                 "metadata": {
                     "filename": "return_shipping_policy.pdf",
@@ -59,12 +133,14 @@ def insert_data_via_api():
         ]
     }
     
-    print(f"🔗 Making POST request to: {url}")
+    print(f"🔗 Making POST request to: {_URL}")
     print(f"📊 Inserting {len(sample_data['data'])} documents")
     
     try:
-        # Make the POST request
-        response = requests.post(url, headers=headers, json=sample_data, timeout=30)
+        # Serialize once; retries resend the same body
+        body = _encode_body(sample_data)
+        with _create_session() as session:
+            response = session.post(_URL, headers=_HEADERS, data=body, timeout=30)
         
         print(f"📡 Response Status: {response.status_code}")
         print(f"📄 Response Headers: {dict(response.headers)}")
@@ -84,53 +160,57 @@ def insert_data_via_api():
         print(f"❌ Unexpected error: {e}")
 
 def insert_from_local_data():
-    """Insert data from local vector database file"""
-    
-    url = "https://in03-a39eed178c34f1b.serverless.aws-eu-central-1.cloud.zilliz.com/v2/vectordb/entities/insert"
-    
-    headers = {
-        "Authorization": f"Bearer {os.getenv('MILVUS_TOKEN')}",
-        "Content-Type": "application/json"
-    }
+    """Insert data from local vector database file, preferring the gRPC client"""
+    if os.getenv("MILVUS_URI"):
+        import load_data_to_cloud as grpc_loader
+        
+        if grpc_loader.MILVUS_AVAILABLE and grpc_loader.connect_to_cloud_milvus():
+            from pymilvus import Collection
+            
+            print("🔗 Inserting through the Milvus gRPC client")
+            collection = Collection("ecom")
+            inserted = grpc_loader.insert_data_to_collection(collection, grpc_loader.load_documents_from_file())
+            if not inserted:
+                # Earlier batches may already be stored, so retrying over REST could duplicate them
+                raise RuntimeError("gRPC insert into 'ecom' failed; see the error above")
+            return
     
+    print("⚠️ gRPC client unavailable, inserting via REST API")
+    insert_from_local_data_rest()
+
+def insert_from_local_data_rest():
+    """Insert data from local vector database file using the REST API"""
     try:
-        # Load local data
-        print("📄 Loading local vector database...")
-        with open('data/vector_database.json', 'r') as f:
-            docs = json.load(f)
-        
-        # Prepare data for API
-        api_data = {
-            "collectionName": "ecom",
-            "data": []
-        }
-        
-        for doc in docs:
-            if 'embedding' in doc and doc['embedding']:
-                api_data['data'].append({
-                    "embedding": doc['embedding'],
-                    "text": doc['text'],
-                    "metadata": doc['metadata']
-                })
+        # Stream local data so only a few batches are held in memory at a time
+        print("📄 Streaming local vector database...")
+        inserted = 0
+        with open('data/vector_database.json', 'rb') as f, \
+                _create_session() as session, \
+                ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            docs = (doc for doc in ijson.items(f, 'documents.item', use_float=True)
+                    if doc.get('embedding'))
+            
+            pending = set()
+            while True:
+                batch = list(islice(docs, BATCH_SIZE))
+                if not batch:
+                    break
+                
+                print(f"🔗 Making POST request with {len(batch)} documents")
+                pending.add(executor.submit(_post_batch, session, _URL, _HEADERS, batch))
+                
+                # Bound the number of batches waiting to be sent
+                if len(pending) >= MAX_WORKERS * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    inserted += sum(future.result() for future in done)
+            
+            inserted += sum(future.result() for future in pending)
         
-        if not api_data['data']:
+        if not inserted:
             print("❌ No valid data found in local file")
             return
-            
-        print(f"🔗 Making POST request with {len(api_data['data'])} documents")
-        
-        # Make the request
-        response = requests.post(url, headers=headers, json=api_data, timeout=60)
-        
-        print(f"📡 Response Status: {response.status_code}")
         
-        if response.status_code == 200:
-            result = response.json()
-            print(f"✅ Success! Inserted {len(api_data['data'])} documents")
-            print(f"Response: {json.dumps(result, indent=2)}")
-        else:
-            print(f"❌ Error: {response.status_code}")
-            print(f"Response: {response.text}")
+        print(f"✅ Success! Inserted {inserted} documents")
             
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -140,8 +220,7 @@ if __name__ == "__main__":
     print("=" * 50)
     
     # Check if token is available
-    token = os.getenv('MILVUS_TOKEN')
-    if not token:
+    if not _TOKEN:
         print("❌ MILVUS_TOKEN not found in environment")
         exit(1)
     
@@ -13,24 +13,48 @@ load_dotenv()
 # Add src to path
 sys.path.append('src')
 
-from typing import List, Dict, Any
-import json
-
-# Import required modules
-try:
-    from pymilvus import Collection, FieldSchema, CollectionSchema, DataType, connections, utility
-    from sentence_transformers import SentenceTransformer
-    MILVUS_AVAILABLE = True
-    print("✅ PyMilvus available")
-except ImportError as e:
-    print(f"❌ Import error: {e}")
-    print("Install with: pip install pymilvus")
-    MILVUS_AVAILABLE = False
-    sys.exit(1)
+import time
+import importlib.util
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+from itertools import islice
+import ijson
+import orjson
+import numpy as np
 
+from embedding_runtime import get_embedding_model, is_model_embedding
+
+# pymilvus and sentence_transformers (which pulls in torch) are imported by the
+# functions that need them, so importing this module stays cheap
+MILVUS_AVAILABLE = (
+    importlib.util.find_spec("pymilvus") is not None
+    and importlib.util.find_spec("sentence_transformers") is not None
+)
+if not MILVUS_AVAILABLE:
+    print("❌ PyMilvus or sentence-transformers not installed")
+    print("Install with: pip install pymilvus sentence-transformers")
+
+# Documents encoded and inserted per batch
+BATCH_SIZE = 500
+
+# Dimension of all-MiniLM-L6-v2 embeddings
+EMBEDDING_DIM = 384
+
+# Legacy monolithic database and its split form (float32 matrix + one JSON document per line)
+DATABASE_FILE = 'data/vector_database.json'
+EMBEDDINGS_FILE = 'data/embeddings.npy'
+META_FILE = 'data/meta.jsonl'
+
+# Where BULK_IMPORT=1 stages row files for Milvus bulk insert
+BULK_STAGING_DIR = 'data/bulk'
 
 def connect_to_cloud_milvus():
     """Connect to cloud Milvus using environment credentials"""
+    from pymilvus import connections
+    
+    # Reuse the process-wide channel instead of repeating the gRPC/TLS handshake
+    if connections.has_connection("default"):
+        return True
+    
     try:
         # Get credentials from environment
         uri = os.getenv("MILVUS_URI")
@@ -78,6 +102,8 @@ def connect_to_cloud_milvus():
 
 def create_collection():
     """Create or recreate the collection"""
+    from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+    
     collection_name = os.getenv("MILVUS_COLLECTION_NAME", "ecom123")
     
     # Drop existing collection if it exists
@@ -90,7 +116,7 @@ def create_collection():
     # Define schema
     fields = [
         FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=384),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=EMBEDDING_DIM),
         FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=10000),
         FieldSchema(name="metadata", dtype=DataType.JSON)
     ]
@@ -112,70 +138,202 @@ def create_collection():
     return collection
 
 
-def load_documents_from_file():
-    """Load documents from the vector database file"""
+def convert_vector_database():
+    """Split the legacy JSON database into an embeddings .npy file and a metadata .jsonl file"""
+    embeddings = []
+    with open(DATABASE_FILE, 'rb') as src, open(META_FILE, 'wb') as meta:
+        for doc in ijson.items(src, 'documents.item', use_float=True):
+            embedding = doc.pop('embedding', None)
+            if not embedding:
+                raise ValueError(f"Document {doc.get('id')} has no embedding; keep using {DATABASE_FILE}")
+            embeddings.append(np.asarray(embedding, dtype=np.float32))
+            meta.write(orjson.dumps(doc) + b"\n")
+    
+    np.save(EMBEDDINGS_FILE, np.stack(embeddings))
+    print(f"✅ Wrote {len(embeddings)} documents to {EMBEDDINGS_FILE} and {META_FILE}")
+
+
+def load_documents_from_file() -> Iterator[Dict[str, Any]]:
+    """Stream documents from the split database if present, else from the legacy JSON file"""
     try:
-        with open('data/vector_database.json', 'r') as f:
-            data = json.load(f)
-        print(f"📄 Loaded {len(data)} documents from file")
-        return data
+        if os.path.exists(EMBEDDINGS_FILE) and os.path.exists(META_FILE):
+            # Memory-mapped rows are read from the page cache without copying the whole matrix
+            embeddings = np.load(EMBEDDINGS_FILE, mmap_mode='r')
+            with open(META_FILE, 'rb') as f:
+                # zip() would silently drop the tail of the longer file, so check before inserting anything
+                line_count = sum(1 for _ in f)
+                if line_count != len(embeddings):
+                    raise ValueError(
+                        f"{EMBEDDINGS_FILE} has {len(embeddings)} rows but {META_FILE} has {line_count} lines; "
+                        f"re-run with --convert"
+                    )
+                f.seek(0)
+                for embedding, line in zip(embeddings, f):
+                    doc = orjson.loads(line)
+                    doc['embedding'] = embedding
+                    yield doc
+        else:
+            with open(DATABASE_FILE, 'rb') as f:
+                yield from ijson.items(f, 'documents.item', use_float=True)
     except Exception as e:
+        # Re-raise so a malformed file fails the load instead of silently truncating it
         print(f"❌ Error loading documents: {e}")
-        return []
+        raise
 
 
 def generate_embeddings(texts: List[str]):
     """Generate embeddings for text chunks"""
     try:
-        print("🔄 Loading embedding model...")
-        model = SentenceTransformer('all-MiniLM-L6-v2')
+        model = get_embedding_model()
         print("🔄 Generating embeddings...")
-        embeddings = model.encode(texts, show_progress_bar=True)
+        embeddings = model.encode(
+            texts,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
         print(f"✅ Generated {len(embeddings)} embeddings")
-        return embeddings.tolist()
+        # Keep the float32 ndarray; pymilvus accepts it without per-float boxing
+        return embeddings
     except Exception as e:
         print(f"❌ Error generating embeddings: {e}")
         return None
 
 
-def insert_data_to_collection(collection, documents):
-    """Insert documents into the collection"""
-    if not documents:
-        print("❌ No documents to insert")
-        return False
+def iter_column_batches(documents: Iterable[Dict[str, Any]]) -> Iterator[Tuple[np.ndarray, List[str], List[Dict[str, Any]]]]:
+    """Group documents into (embeddings, texts, metadata) column batches of BATCH_SIZE"""
+    documents = iter(documents)
+    while True:
+        batch = list(islice(documents, BATCH_SIZE))
+        if not batch:
+            return
+        
+        # Extract texts, metadata and stored embeddings in a single pass;
+        # only documents without a real model embedding (missing or placeholder) are encoded
+        texts, metadata, missing = [], [], []
+        embeddings = np.empty((len(batch), EMBEDDING_DIM), dtype=np.float32)
+        for i, doc in enumerate(batch):
+            texts.append(doc.get("text", ""))
+            metadata.append(doc.get("metadata", {}))
+            embedding = doc.get("embedding")
+            if is_model_embedding(embedding, EMBEDDING_DIM):
+                embeddings[i] = embedding
+            else:
+                missing.append(i)
+        
+        if missing:
+            generated = generate_embeddings([texts[i] for i in missing])
+            if generated is None:
+                raise RuntimeError("failed to generate embeddings")
+            embeddings[missing] = generated
+        
+        yield embeddings, texts, metadata
+
+
+def iter_row_batches(collection, documents: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Group documents into batches of rows keyed by the collection's field names.
     
-    # Extract texts and metadata
-    texts = [doc.get("text", "") for doc in documents]
-    metadata = [doc.get("metadata", {}) for doc in documents]
+    Schema fields other than embedding, text and metadata (explicit ids, snippets) are
+    copied from each document when present, since rows must supply every field the
+    server does not generate.
+    """
+    extra_fields = [
+        field.name for field in collection.schema.fields
+        if field.name not in ("embedding", "text", "metadata") and not (field.is_primary and field.auto_id)
+    ]
+    # Extra field values of the batch being read; iter_column_batches preserves document order
+    extras: List[Dict[str, Any]] = []
     
-    # Generate embeddings
-    embeddings = generate_embeddings(texts)
-    if embeddings is None:
-        return False
+    def _track_extras(docs):
+        for doc in docs:
+            extras.append({name: doc[name] for name in extra_fields if name in doc})
+            yield doc
     
-    # Prepare data for insertion
-    data = {
-        "embedding": embeddings,
-        "text": texts,
-        "metadata": metadata
-    }
+    for embeddings, texts, metadata in iter_column_batches(_track_extras(documents)):
+        rows = [
+            {"embedding": embedding, "text": text, "metadata": meta, **extra}
+            for embedding, text, meta, extra in zip(embeddings, texts, metadata, extras)
+        ]
+        extras.clear()
+        yield rows
+
+
+def insert_data_to_collection(collection, documents: Iterable[Dict[str, Any]]) -> int:
+    """Insert documents into the collection in batches, returning the inserted count"""
+    inserted = 0
     
-    # Insert data in batches
     try:
         print("🔄 Inserting documents into collection...")
-        insert_result = collection.insert(data)
-        print(f"✅ Inserted {len(texts)} documents")
-        print(f"   Primary keys: {insert_result.primary_keys[:3]}...")
+        for rows in iter_row_batches(collection, documents):
+            # Rows are matched to schema fields by name, whatever order the collection declares them in
+            insert_result = collection.insert(rows)
+            inserted += len(rows)
+            print(f"✅ Inserted {inserted} documents")
+            print(f"   Primary keys: {insert_result.primary_keys[:3]}...")
+        
+        if not inserted:
+            print("❌ No documents to insert")
+            return 0
         
         # Flush to ensure data is written
         print("🔄 Flushing data...")
         collection.flush()
         print("✅ Data flushed to storage")
         
-        return True
+        return inserted
     except Exception as e:
         print(f"❌ Error inserting data: {e}")
-        return False
+        return 0
+
+
+def bulk_insert_documents(collection, documents: Iterable[Dict[str, Any]]) -> int:
+    """
+    Load documents with Milvus bulk insert instead of row-wise inserts.
+    
+    Rows are staged as a row-based JSON file under BULK_STAGING_DIR. The file must be
+    reachable in Milvus' object storage bucket; set BULK_IMPORT_PATH to its path
+    there if it is uploaded somewhere other than the staged relative path.
+    """
+    from pymilvus import BulkInsertState, utility
+    
+    try:
+        os.makedirs(BULK_STAGING_DIR, exist_ok=True)
+        staged_file = os.path.join(BULK_STAGING_DIR, f"{collection.name}_rows.json")
+        
+        staged = 0
+        with open(staged_file, 'wb') as f:
+            f.write(b'{"rows": [')
+            for rows in iter_row_batches(collection, documents):
+                for row in rows:
+                    if staged:
+                        f.write(b",")
+                    f.write(orjson.dumps(row, option=orjson.OPT_SERIALIZE_NUMPY))
+                    staged += 1
+            f.write(b"]}")
+        
+        if not staged:
+            print("❌ No documents to insert")
+            return 0
+        print(f"📦 Staged {staged} documents in {staged_file}")
+        
+        remote_file = os.getenv("BULK_IMPORT_PATH", staged_file)
+        task_id = utility.do_bulk_insert(collection_name=collection.name, files=[remote_file])
+        print(f"🔄 Bulk insert task {task_id} submitted for {remote_file}")
+        
+        while True:
+            state = utility.get_bulk_insert_state(task_id=task_id)
+            if state.state == BulkInsertState.ImportCompleted:
+                print(f"✅ Bulk inserted {state.row_count} documents")
+                return state.row_count
+            if state.state in (BulkInsertState.ImportFailed, BulkInsertState.ImportFailedAndCleaned):
+                print(f"❌ Bulk insert failed: {state.failed_reason}")
+                return 0
+            time.sleep(2)
+    except Exception as e:
+        print(f"❌ Error during bulk insert: {e}")
+        return 0
 
 
 def test_search(collection):
@@ -187,8 +345,7 @@ def test_search(collection):
         
         # Test search
         print("🔍 Testing search functionality...")
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        query_embedding = model.encode(["What is your return policy?"]).tolist()
+        query_embedding = get_embedding_model().encode(["What is your return policy?"]).tolist()
         
         search_params = {
             "metric_type": "COSINE",
@@ -223,6 +380,10 @@ def main():
     print("🚀 Loading E-commerce Data into Cloud Milvus")
     print("=" * 60)
     
+    if not MILVUS_AVAILABLE:
+        print("❌ PyMilvus not available. Install with: pip install pymilvus")
+        return False
+    
     # Step 1: Connect to cloud Milvus
     if not connect_to_cloud_milvus():
         print("❌ Cannot proceed without Milvus connection")
@@ -235,24 +396,22 @@ def main():
         print(f"❌ Error creating collection: {e}")
         return False
     
-    # Step 3: Load documents from file
-    documents = load_documents_from_file()
-    if not documents:
-        print("❌ No documents to load")
+    # Step 3: Stream documents from file and insert them
+    if os.getenv("BULK_IMPORT") == "1":
+        inserted = bulk_insert_documents(collection, load_documents_from_file())
+    else:
+        inserted = insert_data_to_collection(collection, load_documents_from_file())
+    if not inserted:
         return False
     
-    # Step 4: Insert documents
-    if not insert_data_to_collection(collection, documents):
-        return False
-    
-    # Step 5: Test search
+    # Step 4: Test search
     if not test_search(collection):
         return False
     
     print("\\n" + "=" * 60)
     print("🎉 Data loading complete!")
     print(f"✅ Collection: {collection.name}")
-    print(f"✅ Documents: {len(documents)} documents loaded")
+    print(f"✅ Documents: {inserted} documents loaded")
     print("✅ Vector search: Ready")
     print("\\n💡 Your chatbot will now use the cloud database!")
     print("   The system will automatically connect to your cloud Milvus.")
@@ -261,6 +420,10 @@ def main():
 
 
 if __name__ == "__main__":
+    if "--convert" in sys.argv:
+        convert_vector_database()
+        sys.exit(0)
+    
     success = main()
     if not success:
         print("\\n❌ Data loading failed. Check errors above.")
@@ -5,13 +5,13 @@ Demonstrates the complete system with routing and tool execution
 import json
 import sys
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from orchestrator import get_orchestrator
-from tools.ecom_rag_tool import ecom_rag_tool
+from tools.ecom_rag_tool import ecom_rag_tool, ecom_rag_tool_batch
 from tools.order_tool import order_tool
 from tools.returns_tool import returns_tool
 from tools.inventory_tool import inventory_tool
@@ -30,6 +30,11 @@ class ECommerceOrchestrator:
             "returns_tool": returns_tool,
             "inventory_tool": inventory_tool
         }
+        
+        # Tools that can serve a whole group of queries in one call
+        self.batch_tools = {
+            "ecom_rag_tool": ecom_rag_tool_batch
+        }
     
     def process_user_query(self, query: str, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -57,6 +62,55 @@ class ECommerceOrchestrator:
             # Return clarification or direct response
             return routing_result
     
+    def process_user_queries(self, queries: List[str], user_context: Dict[str, Any] = None) -> List[Any]:
+        """
+        Process a batch of user queries.
+        Routes every query first, then runs each tool over its group of queries;
+        RAG queries are searched together in one embedding batch and one Milvus
+        request. Results are returned in input order; a failing query yields an
+        error result instead of aborting the batch.
+        """
+        results: List[Any] = [None] * len(queries)
+        groups: Dict[str, List[int]] = {}
+        
+        # First pass: route all queries and group tool calls by tool
+        routings = []
+        for i, query in enumerate(queries):
+            try:
+                routing_result = self.orchestrator.process_query(query, user_context)
+            except Exception as e:
+                routing_result = {"status": "error", "error": str(e)}
+            routings.append(routing_result)
+            
+            if isinstance(routing_result, dict) and "tool" in routing_result:
+                groups.setdefault(routing_result["tool"], []).append(i)
+            else:
+                results[i] = routing_result
+        
+        # Second pass: execute each tool over its queries
+        for tool_name, indices in groups.items():
+            batch_tool = self.batch_tools.get(tool_name)
+            if batch_tool is not None:
+                batch_results = batch_tool([routings[i]["arguments"]["query"] for i in indices], user_context)
+                for i, result in zip(indices, batch_results):
+                    results[i] = result
+                continue
+            
+            tool = self.tools.get(tool_name)
+            for i in indices:
+                if tool is None:
+                    results[i] = {
+                        "status": "error",
+                        "error": f"Tool {tool_name} not found"
+                    }
+                    continue
+                try:
+                    results[i] = tool(**routings[i]["arguments"])
+                except Exception as e:
+                    results[i] = {"status": "error", "error": str(e)}
+        
+        return results
+    
     def demonstrate_routing(self):
         """Demonstrate the routing functionality"""
         test_queries = [
@@ -82,13 +136,13 @@ class ECommerceOrchestrator:
         
         print("=== E-Commerce Orchestrator Demo ===\n")
         
-        for i, query in enumerate(test_queries, 1):
+        results = self.process_user_queries(test_queries)
+        
+        for i, (query, result) in enumerate(zip(test_queries, results), 1):
             print(f"Query {i}: {query}")
             print("-" * 50)
             
             try:
-                result = self.process_user_query(query)
-                
                 # Format output according to specifications
                 if isinstance(result, dict) and "tool" in result:
                     # Tool call format
@@ -116,7 +170,7 @@ class ECommerceOrchestrator:
                     print(result)
                 
             except Exception as e:
-                print(f"Error processing query: {e}")
+                print(f"Error displaying result: {e}")
             
             print("\n" + "="*60 + "\n")
 
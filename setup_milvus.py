@@ -5,12 +5,17 @@ Creates a collection and inserts sample documents for testing
 """
 import os
 import sys
+import math
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append('src')
 
 from typing import List, Dict, Any
 import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from embedding_runtime import get_embedding_model
 
 # Import required modules
 try:
@@ -33,7 +38,6 @@ def start_milvus_lite():
     """Start Milvus Lite server"""
     if MILVUS_LITE_AVAILABLE:
         try:
-            from milvus import default_server
             default_server.start()
             print("✅ Milvus Lite server started")
             return True
@@ -44,7 +48,9 @@ def start_milvus_lite():
 
 
 def connect_to_milvus():
-    """Connect to Milvus"""
+    """Connect to Milvus, reusing an existing default connection"""
+    if connections.has_connection("default"):
+        return True
     try:
         connections.connect(
             alias="default",
@@ -58,149 +64,178 @@ def connect_to_milvus():
         return False
 
 
-def create_collection():
-    """Create the ecommerce_docs collection"""
-    collection_name = "ecommerce_docs"
+# Characters of each document stored in the text_snippet field
+SNIPPET_CHARS = 256
+
+# Smoke-test queries run as a single batched search after setup
+SEARCH_TEST_QUERIES = [
+    "What is your return policy?",
+    "What shipping options do you offer?",
+    "Which payment methods are accepted?",
+    "How do I contact customer service?",
+]
+
+# Query-time parameters matching each index type chosen by _index_params. For large
+# collections where memory bandwidth dominates, IVF_SQ8 ({"nlist": 1024}) stores 8-bit
+# scalar-quantized vectors at ~4x less memory and searches with the same nprobe.
+SEARCH_PARAMS = {
+    "FLAT": {},
+    "HNSW": {"ef": 64},
+    "IVF_FLAT": {"nprobe": 16},
+    "IVF_SQ8": {"nprobe": 16},
+}
+
+
+def _index_params(num_rows: int) -> Dict[str, Any]:
+    """Pick an index for the expected row count: exact below 1K, HNSW up to 1M, IVF beyond"""
+    if num_rows < 1024:
+        index_type, params = "FLAT", {}
+    elif num_rows < 1_000_000:
+        index_type, params = "HNSW", {"M": 16, "efConstruction": 200}
+    else:
+        index_type, params = "IVF_FLAT", {"nlist": int(math.sqrt(num_rows))}
+    # Embeddings are unit-normalized at encode time, so inner product equals cosine
+    # similarity without the per-comparison norm computation
+    return {"metric_type": "IP", "index_type": index_type, "params": params}
+
+
+def _schema_equiv(existing, expected) -> bool:
+    """Compare field names, types, key flags and type params of two collection schemas"""
+    def fields(schema):
+        return [(f.name, f.dtype, f.is_primary, f.auto_id, f.params) for f in schema.fields]
+    return fields(existing) == fields(expected)
+
+
+def create_collection(num_rows: int = 0):
+    """
+    Get or create the ecommerce_docs collection, sizing the vector index for num_rows.
     
-    # Drop existing collection if it exists
-    if utility.has_collection(collection_name):
-        collection = Collection(collection_name)
-        collection.drop()
-        print(f"🗑️ Dropped existing collection: {collection_name}")
+    An existing collection with the same schema is reused as-is; one with a different
+    schema is dropped and recreated.
+    """
+    collection_name = "ecommerce_docs"
     
-    # Define schema
+    # Define schema; explicit ids let re-runs upsert the same rows
     fields = [
-        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=False),
         FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=384),
         FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=10000),
+        # Short prefix returned by searches so hits don't carry the full text
+        FieldSchema(name="text_snippet", dtype=DataType.VARCHAR, max_length=SNIPPET_CHARS * 4),
         FieldSchema(name="metadata", dtype=DataType.JSON)
     ]
-    
     schema = CollectionSchema(fields, "E-commerce documents collection")
+    
+    if utility.has_collection(collection_name):
+        collection = Collection(collection_name)
+        if _schema_equiv(collection.schema, schema) and collection.has_index():
+            print(f"✅ Reusing existing collection: {collection_name}")
+            return collection
+        collection.drop()
+        print(f"🗑️ Dropped existing collection with a different schema: {collection_name}")
+    
     collection = Collection(collection_name, schema)
     print(f"✅ Created collection: {collection_name}")
     
     # Create index for vector search
-    index_params = {
-        "metric_type": "COSINE",
-        "index_type": "IVF_FLAT",
-        "params": {"nlist": 128}
-    }
-    
+    index_params = _index_params(num_rows)
     collection.create_index("embedding", index_params)
-    print("✅ Created vector index")
+    print(f"✅ Created {index_params['index_type']} vector index")
     
     return collection
 
 
+# Sample e-commerce corpus stored column-wise; row i of each list is one document
+SAMPLE_TEXTS: List[str] = [
+    "Our return policy allows customers to return items within 30 days of purchase. All items must be in original condition with tags attached. Refunds will be processed within 5-7 business days after we receive the returned item. For defective items, we offer free return shipping.",
+    "We offer several shipping options: Standard shipping (5-7 business days) for $5.99, Express shipping (2-3 business days) for $12.99, and Overnight shipping (1 business day) for $24.99. Free standard shipping is available on orders over $50. International shipping is available to select countries.",
+    "Customer service is available Monday through Friday from 9 AM to 6 PM EST. You can contact us via email at support@ecommerce.com, phone at 1-800-SHOP-NOW, or live chat on our website. We respond to emails within 24 hours and phone calls are typically answered within 5 minutes.",
+    "Our size guide helps you find the perfect fit. For clothing: XS (0-2), S (4-6), M (8-10), L (12-14), XL (16-18). For shoes: we offer sizes 5-12 in both standard and wide widths. Measurements should be taken without clothing for the most accurate sizing.",
+    "We offer a 1-year warranty on all electronic items and a 90-day warranty on clothing and accessories. Warranty covers manufacturing defects but does not cover damage from normal wear and tear or misuse. To make a warranty claim, contact customer service with your order number and photos of the defect.",
+    "Payment methods accepted include all major credit cards (Visa, MasterCard, American Express, Discover), PayPal, Apple Pay, Google Pay, and buy-now-pay-later options through Klarna and Afterpay. All transactions are secured with 256-bit SSL encryption for your protection.",
+    "Frequently Asked Questions: Q: Can I track my order? A: Yes, you'll receive a tracking number via email once your order ships. Q: Do you offer gift wrapping? A: Yes, gift wrapping is available for $3.99. Q: Can I change my shipping address? A: Yes, but only before the order ships.",
+]
+
+SAMPLE_METADATA: List[Dict[str, Any]] = [
+    {"filename": "return_policy.pdf", "topic": "returns", "source": "policy_documents", "created_at": "2024-11-28"},
+    {"filename": "shipping_guide.pdf", "topic": "shipping", "source": "customer_service", "created_at": "2024-11-28"},
+    {"filename": "contact_info.pdf", "topic": "support", "source": "customer_service", "created_at": "2024-11-28"},
+    {"filename": "size_guide.pdf", "topic": "sizing", "source": "product_info", "created_at": "2024-11-28"},
+    {"filename": "warranty_info.pdf", "topic": "warranty", "source": "policy_documents", "created_at": "2024-11-28"},
+    {"filename": "payment_methods.pdf", "topic": "payment", "source": "billing", "created_at": "2024-11-28"},
+    {"filename": "faq.pdf", "topic": "faq", "source": "customer_service", "created_at": "2024-11-28"}
+]
+
+SAMPLE_IDS: List[int] = list(range(1, len(SAMPLE_TEXTS) + 1))
+
+
 def get_sample_documents():
     """Get sample e-commerce documents"""
-    documents = [
-        {
-            "text": "Our return policy allows customers to return items within 30 days of purchase. All items must be in original condition with tags attached. Refunds will be processed within 5-7 business days after we receive the returned item. For defective items, we offer free return shipping.",
-            "metadata": {
-                "filename": "return_policy.pdf",
-                "topic": "returns",
-                "source": "policy_documents",
-                "created_at": "2024-11-28"
-            }
-        },
-        {
-            "text": "We offer several shipping options: Standard shipping (5-7 business days) for $5.99, Express shipping (2-3 business days) for $12.99, and Overnight shipping (1 business day) for $24.99. Free standard shipping is available on orders over $50. International shipping is available to select countries.",
-            "metadata": {
-                "filename": "shipping_guide.pdf",
-                "topic": "shipping",
-                "source": "customer_service",
-                "created_at": "2024-11-28"
-            }
-        },
-        {
-            "text": "Customer service is available Monday through Friday from 9 AM to 6 PM EST. You can contact us via email at support@ecommerce.com, phone at 1-800-SHOP-NOW, or live chat on our website. We respond to emails within 24 hours and phone calls are typically answered within 5 minutes.",
-            "metadata": {
-                "filename": "contact_info.pdf",
-                "topic": "support",
-                "source": "customer_service",
-                "created_at": "2024-11-28"
-            }
-        },
-        {
-            "text": "Our size guide helps you find the perfect fit. For clothing: XS (0-2), S (4-6), M (8-10), L (12-14), XL (16-18). For shoes: we offer sizes 5-12 in both standard and wide widths. Measurements should be taken without clothing for the most accurate sizing.",
-            "metadata": {
-                "filename": "size_guide.pdf",
-                "topic": "sizing",
-                "source": "product_info",
-                "created_at": "2024-11-28"
-            }
-        },
-        {
-            "text": "We offer a 1-year warranty on all electronic items and a 90-day warranty on clothing and accessories. Warranty covers manufacturing defects but does not cover damage from normal wear and tear or misuse. To make a warranty claim, contact customer service with your order number and photos of the defect.",
-            "metadata": {
-                "filename": "warranty_info.pdf",
-                "topic": "warranty",
-                "source": "policy_documents",
-                "created_at": "2024-11-28"
-            }
-        },
-        {
-            "text": "Payment methods accepted include all major credit cards (Visa, MasterCard, American Express, Discover), PayPal, Apple Pay, Google Pay, and buy-now-pay-later options through Klarna and Afterpay. All transactions are secured with 256-bit SSL encryption for your protection.",
-            "metadata": {
-                "filename": "payment_methods.pdf",
-                "topic": "payment",
-                "source": "billing",
-                "created_at": "2024-11-28"
-            }
-        },
-        {
-            "text": "Frequently Asked Questions: Q: Can I track my order? A: Yes, you'll receive a tracking number via email once your order ships. Q: Do you offer gift wrapping? A: Yes, gift wrapping is available for $3.99. Q: Can I change my shipping address? A: Yes, but only before the order ships.",
-            "metadata": {
-                "filename": "faq.pdf",
-                "topic": "faq",
-                "source": "customer_service",
-                "created_at": "2024-11-28"
-            }
-        }
+    return [
+        {"text": text, "metadata": metadata}
+        for text, metadata in zip(SAMPLE_TEXTS, SAMPLE_METADATA)
     ]
-    return documents
 
 
 def generate_embeddings(texts: List[str]):
     """Generate embeddings for text chunks"""
     try:
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        embeddings = model.encode(texts)
+        model = get_embedding_model()
+        # encode() length-sorts the whole list before batching (and restores the
+        # input order), so pass all texts in one call rather than per document
+        embeddings = model.encode(
+            texts,
+            batch_size=128 if model.device.type != 'cpu' else 64,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
         print(f"✅ Generated {len(embeddings)} embeddings")
-        return embeddings.tolist()
+        # Hand the contiguous float32 matrix to pymilvus instead of boxed Python floats
+        return embeddings.astype(np.float32, copy=False)
     except Exception as e:
         print(f"❌ Error generating embeddings: {e}")
         return None
 
 
-def insert_sample_data(collection):
-    """Insert sample documents into collection"""
-    documents = get_sample_documents()
-    
-    # Extract texts for embedding generation
-    texts = [doc["text"] for doc in documents]
+def insert_sample_data(collection, embeddings=None):
+    """Upsert sample documents into collection, encoding them unless embeddings are given"""
+    texts = SAMPLE_TEXTS
     
     # Generate embeddings
-    embeddings = generate_embeddings(texts)
+    if embeddings is None:
+        embeddings = generate_embeddings(texts)
     if embeddings is None:
         print("❌ Failed to generate embeddings")
         return False
     
-    # Prepare data for insertion
-    data = {
-        "embedding": embeddings,
-        "text": texts,
-        "metadata": [doc["metadata"] for doc in documents]
-    }
+    # Optional bulk import: stage a row file and let the server ingest it, skipping the WAL
+    if os.getenv("BULK_IMPORT") == "1":
+        from load_data_to_cloud import bulk_insert_documents
+        # Bulk import only appends, so remove rows left by an earlier run first
+        collection.delete(expr=f"id in {SAMPLE_IDS}")
+        rows = [
+            {"id": doc_id, "text": text, "text_snippet": text[:SNIPPET_CHARS],
+             "metadata": metadata, "embedding": embedding}
+            for doc_id, text, metadata, embedding in zip(SAMPLE_IDS, texts, SAMPLE_METADATA, embeddings)
+        ]
+        return bulk_insert_documents(collection, rows) > 0
     
-    # Insert data
+    # Columns in schema field order; a dict would be taken as a single row
+    data = [
+        SAMPLE_IDS,
+        embeddings,
+        texts,
+        [text[:SNIPPET_CHARS] for text in texts],
+        SAMPLE_METADATA
+    ]
+    
+    # Upsert so re-running setup against a reused collection replaces rows by id
     try:
-        insert_result = collection.insert(data)
+        upsert_result = collection.upsert(data, _async=True).result()
         collection.flush()
-        print(f"✅ Inserted {len(texts)} documents")
-        print(f"   Insert IDs: {insert_result.primary_keys[:3]}...")
+        print(f"✅ Upserted {len(texts)} documents")
+        print(f"   IDs: {upsert_result.primary_keys[:3]}...")
         return True
     except Exception as e:
         print(f"❌ Error inserting data: {e}")
@@ -212,27 +247,31 @@ def setup_milvus_database():
     print("🚀 Setting up Milvus database for E-commerce Orchestrator")
     print("=" * 60)
     
-    # Step 1: Start Milvus Lite
-    if not start_milvus_lite():
-        print("❌ Cannot proceed without Milvus")
-        return False
-    
-    # Step 2: Connect to Milvus
-    if not connect_to_milvus():
-        print("❌ Cannot connect to Milvus")
-        return False
-    
-    # Step 3: Create collection
-    try:
-        collection = create_collection()
-    except Exception as e:
-        print(f"❌ Error creating collection: {e}")
-        return False
-    
-    # Step 4: Insert sample data
-    if not insert_sample_data(collection):
-        print("❌ Failed to insert sample data")
-        return False
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Model load + encoding runs while Milvus starts and the collection and index are created
+        embeddings_future = executor.submit(generate_embeddings, SAMPLE_TEXTS)
+        
+        # Step 1: Start Milvus Lite
+        if not start_milvus_lite():
+            print("❌ Cannot proceed without Milvus")
+            return False
+        
+        # Step 2: Connect to Milvus
+        if not connect_to_milvus():
+            print("❌ Cannot connect to Milvus")
+            return False
+        
+        # Step 3: Create collection
+        try:
+            collection = create_collection(len(SAMPLE_TEXTS))
+        except Exception as e:
+            print(f"❌ Error creating collection: {e}")
+            return False
+        
+        # Step 4: Insert sample data
+        if not insert_sample_data(collection, embeddings_future.result()):
+            print("❌ Failed to insert sample data")
+            return False
     
     # Step 5: Load collection for search
     try:
@@ -244,29 +283,35 @@ def setup_milvus_database():
     
     # Step 6: Test search
     try:
-        # Test search
-        from sentence_transformers import SentenceTransformer
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        query_embedding = model.encode(["What is your return policy?"]).tolist()
+        # Encode all smoke-test queries at once with the model already loaded for the inserts
+        query_embeddings = get_embedding_model().encode(
+            SEARCH_TEST_QUERIES,
+            batch_size=16,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
         
+        index = collection.indexes[0].params
         search_params = {
-            "metric_type": "COSINE",
-            "params": {"nprobe": 10}
+            "metric_type": index["metric_type"],
+            "params": SEARCH_PARAMS.get(index["index_type"], {})
         }
         
+        # One search call with every query vector instead of one RPC per query
         results = collection.search(
-            data=query_embedding,
+            data=query_embeddings,
             anns_field="embedding",
             param=search_params,
             limit=3,
-            output_fields=["text", "metadata"]
+            output_fields=["text_snippet", "metadata"]
         )
         
-        if results and len(results[0]) > 0:
-            print("✅ Search test successful")
-            print(f"   Found: {results[0][0].entity.get('text', '')[:50]}...")
+        hits = sum(1 for hit_list in results if len(hit_list) > 0)
+        if hits == len(SEARCH_TEST_QUERIES):
+            print(f"✅ Search test successful ({hits}/{len(SEARCH_TEST_QUERIES)} queries)")
+            print(f"   Found: {results[0][0].entity.get('text_snippet', '')[:50]}...")
         else:
-            print("⚠️ Search test returned no results")
+            print(f"⚠️ Search test returned results for {hits}/{len(SEARCH_TEST_QUERIES)} queries")
         
     except Exception as e:
         print(f"⚠️ Search test failed: {e}")
@@ -7,11 +7,39 @@ import os
 import sys
 import json
 from datetime import datetime
+import numpy as np
 
 # Ensure we can import our modules
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(project_root, 'src'))
 
+# Sample e-commerce corpus stored column-wise; row i of each list is one document
+SAMPLE_TEXTS = [
+    "Our return policy allows customers to return items within 30 days of purchase. All items must be in original condition with tags attached. Refunds will be processed within 5-7 business days after we receive the returned item. For defective items, we offer free return shipping.",
+    "We offer several shipping options: Standard shipping (5-7 business days) for $5.99, Express shipping (2-3 business days) for $12.99, and Overnight shipping (1 business day) for $24.99. Free standard shipping is available on orders over $50.",
+    "Customer service is available Monday through Friday from 9 AM to 6 PM EST. You can contact us via email at support@ecommerce.com, phone at 1-800-SHOP-NOW, or live chat on our website. We respond to emails within 24 hours.",
+    "Our size guide helps you find the perfect fit. For clothing: XS (0-2), S (4-6), M (8-10), L (12-14), XL (16-18). For shoes: we offer sizes 5-12 in both standard and wide widths. Measurements should be taken without clothing for accuracy.",
+    "We offer a 1-year warranty on all electronic items and a 90-day warranty on clothing and accessories. Warranty covers manufacturing defects but does not cover damage from normal wear and tear or misuse.",
+    "Payment methods accepted include all major credit cards (Visa, MasterCard, American Express, Discover), PayPal, Apple Pay, Google Pay, and buy-now-pay-later options through Klarna and Afterpay.",
+    "Frequently Asked Questions: Q: Can I track my order? A: Yes, you'll receive a tracking number via email once your order ships. Q: Do you offer gift wrapping? A: Yes, gift wrapping is available for $3.99.",
+]
+
+# Fields shared by every sample document
+_BASE_META = {"created_at": "2024-11-28"}
+
+SAMPLE_METADATA = [
+    {"filename": filename, "topic": topic, "source": source, **_BASE_META}
+    for filename, topic, source in (
+        ("return_policy.pdf", "returns", "policy_documents"),
+        ("shipping_guide.pdf", "shipping", "customer_service"),
+        ("contact_info.pdf", "support", "customer_service"),
+        ("size_guide.pdf", "sizing", "product_info"),
+        ("warranty_info.pdf", "warranty", "policy_documents"),
+        ("payment_methods.pdf", "payment", "billing"),
+        ("faq.pdf", "faq", "customer_service")
+    )
+]
+
 def create_mock_vector_database():
     """Create a simple file-based vector database"""
     print("🗂️ Creating local vector database (file-based)")
@@ -20,88 +48,18 @@ def create_mock_vector_database():
     data_dir = os.path.join(project_root, 'data')
     os.makedirs(data_dir, exist_ok=True)
     
-    # Sample e-commerce documents with pre-computed embeddings
+    # Assemble row records from the columns only for the JSON document format
     documents = [
-        {
-            "id": 1,
-            "text": "Our return policy allows customers to return items within 30 days of purchase. All items must be in original condition with tags attached. Refunds will be processed within 5-7 business days after we receive the returned item. For defective items, we offer free return shipping.",
-            "metadata": {
-                "filename": "return_policy.pdf",
-                "topic": "returns",
-                "source": "policy_documents",
-                "created_at": "2024-11-28"
-            },
-            "embedding": [0.1] * 384  # Mock 384-dim embedding
-        },
-        {
-            "id": 2,
-            "text": "We offer several shipping options: Standard shipping (5-7 business days) for $5.99, Express shipping (2-3 business days) for $12.99, and Overnight shipping (1 business day) for $24.99. Free standard shipping is available on orders over $50.",
-            "metadata": {
-                "filename": "shipping_guide.pdf",
-                "topic": "shipping",
-                "source": "customer_service",
-                "created_at": "2024-11-28"
-            },
-            "embedding": [0.2] * 384
-        },
-        {
-            "id": 3,
-            "text": "Customer service is available Monday through Friday from 9 AM to 6 PM EST. You can contact us via email at support@ecommerce.com, phone at 1-800-SHOP-NOW, or live chat on our website. We respond to emails within 24 hours.",
-            "metadata": {
-                "filename": "contact_info.pdf",
-                "topic": "support",
-                "source": "customer_service",
-                "created_at": "2024-11-28"
-            },
-            "embedding": [0.3] * 384
-        },
-        {
-            "id": 4,
-            "text": "Our size guide helps you find the perfect fit. For clothing: XS (0-2), S (4-6), M (8-10), L (12-14), XL (16-18). For shoes: we offer sizes 5-12 in both standard and wide widths. Measurements should be taken without clothing for accuracy.",
-            "metadata": {
-                "filename": "size_guide.pdf",
-                "topic": "sizing",
-                "source": "product_info",
-                "created_at": "2024-11-28"
-            },
-            "embedding": [0.4] * 384
-        },
-        {
-            "id": 5,
-            "text": "We offer a 1-year warranty on all electronic items and a 90-day warranty on clothing and accessories. Warranty covers manufacturing defects but does not cover damage from normal wear and tear or misuse.",
-            "metadata": {
-                "filename": "warranty_info.pdf",
-                "topic": "warranty",
-                "source": "policy_documents",
-                "created_at": "2024-11-28"
-            },
-            "embedding": [0.5] * 384
-        },
-        {
-            "id": 6,
-            "text": "Payment methods accepted include all major credit cards (Visa, MasterCard, American Express, Discover), PayPal, Apple Pay, Google Pay, and buy-now-pay-later options through Klarna and Afterpay.",
-            "metadata": {
-                "filename": "payment_methods.pdf",
-                "topic": "payment",
-                "source": "billing",
-                "created_at": "2024-11-28"
-            },
-            "embedding": [0.6] * 384
-        },
-        {
-            "id": 7,
-            "text": "Frequently Asked Questions: Q: Can I track my order? A: Yes, you'll receive a tracking number via email once your order ships. Q: Do you offer gift wrapping? A: Yes, gift wrapping is available for $3.99.",
-            "metadata": {
-                "filename": "faq.pdf",
-                "topic": "faq",
-                "source": "customer_service",
-                "created_at": "2024-11-28"
-            },
-            "embedding": [0.7] * 384
-        }
+        {"id": i, "text": text, "metadata": metadata}
+        for i, (text, metadata) in enumerate(zip(SAMPLE_TEXTS, SAMPLE_METADATA), start=1)
     ]
     
-    # Save to file
+    # Mock 384-dim embeddings: row i is filled with i/10, as one broadcast view
+    embeddings = np.broadcast_to(
+        (np.arange(1, len(documents) + 1) / 10)[:, None], (len(documents), 384)
+    )
+    
+    # Save to file; embeddings become Python lists only here, for JSON
     db_file = os.path.join(data_dir, 'vector_database.json')
     with open(db_file, 'w') as f:
         json.dump({
@@ -110,11 +68,23 @@ def create_mock_vector_database():
                 "fields": ["id", "text", "metadata", "embedding"],
                 "embedding_dim": 384
             },
-            "documents": documents,
+            "documents": [
+                dict(doc, embedding=embedding)
+                for doc, embedding in zip(documents, embeddings.tolist())
+            ],
             "created_at": datetime.now().isoformat()
         }, f, indent=2)
     
+    # Binary sidecars for the loaders: a memory-mappable float32 matrix plus one
+    # JSON line of text/metadata per row, in the same order
+    embeddings_file = os.path.join(data_dir, 'embeddings.npy')
+    np.save(embeddings_file, embeddings.astype(np.float32))
+    with open(os.path.join(data_dir, 'meta.jsonl'), 'w') as f:
+        for doc in documents:
+            f.write(json.dumps(doc) + "\n")
+    
     print(f"✅ Created vector database: {db_file}")
+    print(f"✅ Wrote embeddings: {embeddings_file}")
     print(f"✅ Inserted {len(documents)} documents")
     print("✅ Ready for vector search!")
     
@@ -5,34 +5,91 @@ Simple data loader for cloud Milvus collection
 import os
 import sys
 import json
+from itertools import islice
+import ijson
+import numpy as np
 from dotenv import load_dotenv
 
 # Load environment
 load_dotenv()
 sys.path.append('src')
 
+from embedding_runtime import get_embedding_model, is_model_embedding
+
+EMBEDDING_DIM = 384
+BATCH_SIZE = 512
+
+def _encode(texts):
+    """Encode texts with the shared embedding model into a float32 matrix"""
+    model = get_embedding_model()
+    # One encode() call per batch lets sentence-transformers length-sort its texts
+    return model.encode(
+        texts,
+        batch_size=128 if model.device.type != 'cpu' else 32,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    ).astype(np.float32, copy=False)
+
+def _iter_documents():
+    """Stream (doc, embedding) pairs from the .npy/.jsonl sidecars or the JSON database"""
+    if os.path.exists('data/embeddings.npy') and os.path.exists('data/meta.jsonl'):
+        # Zero-copy float32 view; rows line up with meta.jsonl
+        embeddings = np.load('data/embeddings.npy', mmap_mode='r')
+        with open('data/meta.jsonl', 'r') as f:
+            # zip() would silently drop the tail of the longer file, so check before inserting anything
+            line_count = sum(1 for _ in f)
+            if line_count != len(embeddings):
+                raise ValueError(
+                    f"data/embeddings.npy has {len(embeddings)} rows but data/meta.jsonl has {line_count} lines; "
+                    f"re-run setup_simple_db.py"
+                )
+            f.seek(0)
+            for embedding, line in zip(embeddings, f):
+                yield json.loads(line), embedding
+    else:
+        with open('data/vector_database.json', 'rb') as f:
+            for doc in ijson.items(f, 'documents.item', use_float=True):
+                yield doc, doc.pop('embedding', None)
+
+def _insert_batch(collection, batch) -> int:
+    """Insert one batch, reusing stored model embeddings and encoding placeholder or missing ones"""
+    # Split the batch into columns in a single pass
+    texts, metadata, need = [], [], []
+    embeddings = np.empty((len(batch), EMBEDDING_DIM), dtype=np.float32)
+    for i, (doc, embedding) in enumerate(batch):
+        texts.append(doc['text'])
+        metadata.append(doc['metadata'])
+        if is_model_embedding(embedding, EMBEDDING_DIM):
+            embeddings[i] = embedding
+        else:
+            need.append(i)
+    if need:
+        print(f"🔄 Generating embeddings for {len(need)} documents...")
+        embeddings[need] = _encode([texts[i] for i in need])
+    
+    collection.insert({
+        'embedding': embeddings,
+        'text': texts,
+        'metadata': metadata
+    })
+    return len(batch)
+
 def load_data_to_cloud():
     """Load data from local file to cloud collection"""
     try:
         from pymilvus import Collection, connections
-        from sentence_transformers import SentenceTransformer
         
-        print("🔗 Connecting to cloud Milvus...")
-        connections.connect(
-            'default', 
-            uri=os.getenv('MILVUS_URI'),
-            token=os.getenv('MILVUS_TOKEN')
-        )
+        if not connections.has_connection('default'):
+            print("🔗 Connecting to cloud Milvus...")
+            connections.connect(
+                'default', 
+                uri=os.getenv('MILVUS_URI'),
+                token=os.getenv('MILVUS_TOKEN')
+            )
         
         collection = Collection('ecom')
         print(f"📊 Current collection size: {collection.num_entities}")
         
-        # Load local data
-        print("📄 Loading local data...")
-        with open('data/vector_database.json', 'r') as f:
-            docs = json.load(f)
-        print(f"Found {len(docs)} documents")
-        
         # Clear existing data if it looks corrupted
         if collection.num_entities > 0:
             print("🗑️ Clearing existing data...")
@@ -40,23 +97,19 @@ def load_data_to_cloud():
             collection.flush()
             print("✅ Collection cleared")
         
-        # Prepare data
-        print("🔄 Generating embeddings...")
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        texts = [doc['text'] for doc in docs]
-        embeddings = model.encode(texts).tolist()
-        
-        data = {
-            'embedding': embeddings,
-            'text': texts,
-            'metadata': [doc['metadata'] for doc in docs]
-        }
-        
-        print("💾 Inserting data...")
-        collection.insert(data)
+        # Stream local data in fixed-size batches so memory stays O(batch)
+        print("📄 Loading and inserting local data...")
+        documents = _iter_documents()
+        inserted = 0
+        while True:
+            batch = list(islice(documents, BATCH_SIZE))
+            if not batch:
+                break
+            inserted += _insert_batch(collection, batch)
+        # A single flush seals all segments once instead of after every batch
         collection.flush()
         
-        print(f"✅ Inserted {len(texts)} documents")
+        print(f"✅ Inserted {inserted} documents")
         print(f"📊 Collection now has {collection.num_entities} documents")
         
         return True
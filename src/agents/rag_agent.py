@@ -2,13 +2,22 @@
 RAG Retriever Agent that handles static knowledge queries using Milvus vector search
 """
 import os
-import sys
+import re
+import copy
 import json
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import time
+import socket
+import atexit
+import hashlib
+import asyncio
+import threading
+from functools import lru_cache
+from itertools import islice
+from collections import Counter, OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Iterator, AsyncIterator
+from dataclasses import dataclass, replace
 
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
 
 try:
     from pymilvus import Collection, connections, utility
@@ -24,6 +33,12 @@ except ImportError:
     print("Warning: Milvus Lite not available. Will try regular Milvus.")
     MILVUS_LITE_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 try:
     from sentence_transformers import SentenceTransformer
     SENTENCE_TRANSFORMERS_AVAILABLE = True
@@ -31,7 +46,42 @@ except ImportError:
     print("Warning: SentenceTransformers not available. Using mock embeddings.")
     SENTENCE_TRANSFORMERS_AVAILABLE = False
 
-from llm_factory import get_default_processor, LLMProcessorFactory
+from llm_factory import get_default_processor, LLMProcessorFactory, COMPLETION_ERROR_REPLY
+from embedding_runtime import load_embedding_model
+
+
+# Lowercase alphanumeric runs; shared by document indexing and query parsing
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=1024)
+def _query_tokens(query: str) -> Tuple[str, ...]:
+    """Tokenize a query once; agent turns often repeat the same sub-query"""
+    return tuple(_TOKEN_RE.findall(query.lower()))
+
+# Named speed/recall trade-offs for ANN search; the key used depends on the index family
+ANN_PROFILES = {
+    "fast": {"ef": 16, "nprobe": 8},
+    "balanced": {"ef": 64, "nprobe": 16},
+    "recall": {"ef": 256, "nprobe": 64},
+}
+
+# Okapi BM25 parameters for scoring document text (same defaults as rank_bm25)
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+
+# Score added per query token found in a document's topic or filename
+_TOPIC_WEIGHT = 0.5
+_FILENAME_WEIGHT = 0.4
+
+# Reachability probes newer than this are trusted instead of opening another socket
+_PROBE_TTL_SECONDS = 5.0
+# Reconnect attempts back off exponentially between these bounds
+_RECONNECT_MIN_DELAY = 1.0
+_RECONNECT_MAX_DELAY = 30.0
+
+# Number of results returned by the file-database and hardcoded fallbacks
+_FALLBACK_TOP_K = 3
 
 
 @dataclass
@@ -41,11 +91,105 @@ class SearchResult:
     text: str
     metadata: Dict[str, Any]
     similarity_score: float
+    # True when text is a Milvus text_snippet rather than the stored document text
+    snippet: bool = False
+
+
+# Hardcoded results used when neither Milvus nor the file database can answer
+_MOCK_RESULTS = (
+    SearchResult(
+        id=1,
+        text="Our return policy allows returns within 30 days of purchase. Items must be in original condition with tags attached. Refunds are processed within 5-7 business days.",
+        metadata={"filename": "return_policy.pdf", "topic": "returns", "source": "policy_documents"},
+        similarity_score=0.85
+    ),
+    SearchResult(
+        id=2, 
+        text="For order tracking, please use your order number and email address on our tracking page. Orders typically ship within 1-2 business days and arrive within 5-7 days.",
+        metadata={"filename": "shipping_guide.pdf", "topic": "shipping", "source": "customer_service"},
+        similarity_score=0.78
+    ),
+    SearchResult(
+        id=3,
+        text="Our customer service team is available Monday-Friday 9AM-6PM EST. You can reach us via email at support@ecommerce.com or phone at 1-800-SHOP-NOW.",
+        metadata={"filename": "contact_info.pdf", "topic": "support", "source": "customer_service"}, 
+        similarity_score=0.72
+    )
+)
+
+# Lowercased token sets of the mock texts, matched against query tokens
+_MOCK_TOKENS = tuple(frozenset(_TOKEN_RE.findall(result.text.lower())) for result in _MOCK_RESULTS)
+
+
+class _AnswerCache:
+    """LRU cache of RAG responses keyed by unit query embeddings, matched by cosine similarity"""
+    
+    def __init__(self, capacity: int = 2048, threshold: float = 0.97, dim: int = 384, ttl: float = 300.0):
+        self.threshold = threshold
+        self.ttl = ttl
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._responses: List[Dict[str, Any]] = []
+        self._stored_at = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        # Slots are written in several steps, so readers must not see a half-replaced entry
+        self._lock = threading.Lock()
+    
+    def get(self, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the cached response for the most similar unexpired query if it clears the threshold"""
+        with self._lock:
+            count = len(self._responses)
+            if not count:
+                return None
+            # Embeddings are unit length, so one matrix-vector product gives every cosine similarity
+            similarities = self._vectors[:count] @ embedding
+            similarities[self._stored_at[:count] < time.monotonic() - self.ttl] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            self._touch(best)
+            # Callers get their own copy, so editing one response cannot change later hits
+            return copy.deepcopy(self._responses[best])
+    
+    def put(self, embedding: np.ndarray, response: Dict[str, Any]):
+        """Store a copy of a response, evicting the least recently used entry when full"""
+        response = copy.deepcopy(response)
+        with self._lock:
+            if len(self._responses) < len(self._vectors):
+                slot = len(self._responses)
+                self._responses.append(response)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._responses[slot] = response
+            self._vectors[slot] = embedding
+            self._stored_at[slot] = time.monotonic()
+            self._touch(slot)
+    
+    def _touch(self, slot: int):
+        self._clock += 1
+        self._last_used[slot] = self._clock
 
 
 class RAGRetrieverAgent:
     """RAG agent for handling static knowledge queries"""
     
+    # Constant prompt parts for answer synthesis, built once per process
+    _SYSTEM_MESSAGE = {
+        "role": "system",
+        "content": "You are a helpful customer service assistant. Use the provided context to answer the user's question accurately and concisely. If the context doesn't contain relevant information, say so clearly."
+    }
+    _USER_TEMPLATE = "Question: {query}\n\nContext:\n{context}\n\nPlease provide a helpful answer based on the context above."
+    
+    # Loaded encoders shared by all instances, least recently used first; only the
+    # EMBEDDING_MODEL_CACHE_SIZE most recently used models stay in memory
+    _embedding_models: "OrderedDict[str, SentenceTransformer]" = OrderedDict()
+    _embedding_models_lock = threading.Lock()
+    _embedding_models_max = max(1, int(os.getenv("EMBEDDING_MODEL_CACHE_SIZE", "2")))
+    
+    # Parsed and indexed file-based database shared by all instances, keyed by file mtime
+    _file_index: Optional[Dict[str, Any]] = None
+    _file_index_mtime: Optional[float] = None
+    
     def __init__(self, 
                  collection_name: str = "ecom",
                  embedding_model: str = "all-MiniLM-L6-v2",
@@ -65,16 +209,20 @@ class RAGRetrieverAgent:
         self.milvus_token = milvus_token
         self.milvus_secure = milvus_secure
         
-        # Initialize embedding model
+        # Initialize embedding model (preloaded into the shared LRU of encoders)
+        self._embedding_enabled = False
         if SENTENCE_TRANSFORMERS_AVAILABLE:
             try:
-                self.embedding_model = SentenceTransformer(embedding_model)
+                self._get_embedding_model(embedding_model)
+                self._embedding_enabled = True
                 print(f"Loaded embedding model: {embedding_model}")
             except Exception as e:
                 print(f"Failed to load embedding model: {e}")
-                self.embedding_model = None
-        else:
-            self.embedding_model = None
+        
+        # Per-instance LRU cache so repeated queries skip the encoder forward pass
+        self._encode_cached = lru_cache(maxsize=1024)(self._encode_text)
+        # Near-duplicate queries reuse an earlier response instead of calling the LLM again
+        self._answer_cache = _AnswerCache()
         
         # Initialize LLM processor
         self.llm_processor = get_default_processor()
@@ -82,6 +230,20 @@ class RAGRetrieverAgent:
         # Initialize milvus connection state
         self.milvus_connected = False
         self.collection = None
+        # Parameters of the last successful connect, reused to re-establish a dropped channel
+        self._connection_params: Optional[Dict[str, Any]] = None
+        # Host/port connect parameters are fixed for the agent's lifetime, so build them once
+        self._server_params = self._build_server_params()
+        self._last_probe_ts = float("-inf")
+        self._last_probe_ok = False
+        # Earliest time the next reconnect may be tried, and the delay applied after it fails
+        self._next_reconnect_at = 0.0
+        self._reconnect_delay = _RECONNECT_MIN_DELAY
+        # Search metric follows the collection's vector index (IP or COSINE)
+        self.metric_type = "COSINE"
+        self.index_type = "AUTOINDEX"
+        # Collections with a text_snippet field return it from searches instead of the full text
+        self.text_field = "text"
         
         # Try to connect to Milvus
         if MILVUS_AVAILABLE:
@@ -106,6 +268,74 @@ class RAGRetrieverAgent:
         # Load collection if connected
         if self.milvus_connected:
             self.collection = self._get_or_create_collection()
+            atexit.register(self.shutdown)
+    
+    @property
+    def embedding_model(self) -> Optional["SentenceTransformer"]:
+        """This agent's encoder, reloaded through the shared LRU if it was evicted"""
+        if not self._embedding_enabled:
+            return None
+        try:
+            return self._get_embedding_model(self.embedding_model_name)
+        except Exception as e:
+            print(f"Failed to load embedding model: {e}")
+            return None
+    
+    @classmethod
+    def _get_embedding_model(cls, model_name: str) -> "SentenceTransformer":
+        """Return a loaded encoder, evicting the least recently used one beyond the cache size"""
+        with cls._embedding_models_lock:
+            model = cls._embedding_models.get(model_name)
+            if model is not None:
+                cls._embedding_models.move_to_end(model_name)
+                return model
+            
+            model = load_embedding_model(model_name)
+            cls._embedding_models[model_name] = model
+            while len(cls._embedding_models) > cls._embedding_models_max:
+                evicted_name, evicted = cls._embedding_models.popitem(last=False)
+                del evicted
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                print(f"Evicted embedding model: {evicted_name}")
+            return model
+    
+    @classmethod
+    def startup(cls) -> "RAGRetrieverAgent":
+        """Create the shared agent eagerly so the model and Milvus channel are ready before the first query"""
+        return get_rag_agent()
+    
+    def shutdown(self):
+        """Close the persistent Milvus connection"""
+        if MILVUS_AVAILABLE and connections.has_connection("default"):
+            connections.disconnect("default")
+        self.milvus_connected = False
+    
+    def _ensure_connection(self) -> bool:
+        """Check the persistent Milvus channel and collection, rebuilding them with the cached parameters if either dropped"""
+        if not (self.milvus_connected and self._connection_params):
+            return False
+        if self.collection is not None and connections.has_connection("default"):
+            return True
+        now = time.monotonic()
+        if now < self._next_reconnect_at:
+            return False
+        try:
+            if not connections.has_connection("default"):
+                print("🔗 Milvus connection lost, reconnecting...")
+                connections.connect(**self._connection_params)
+            self.collection = self._get_or_create_collection()
+        except Exception as e:
+            print(f"Failed to reconnect to Milvus: {e}")
+            self.collection = None
+        if self.collection is None:
+            # Back off 1s, 2s, 4s, ... up to 30s so a flapping server is not hammered
+            self._next_reconnect_at = now + self._reconnect_delay
+            self._reconnect_delay = min(self._reconnect_delay * 2, _RECONNECT_MAX_DELAY)
+            return False
+        self._reconnect_delay = _RECONNECT_MIN_DELAY
+        return True
     
     def _start_milvus_lite(self):
         """Start Milvus Lite (embedded version)"""
@@ -117,11 +347,9 @@ class RAGRetrieverAgent:
             print("Milvus Lite server started successfully")
             
             # Connect to the local Milvus Lite server
-            connections.connect(
-                alias="default",
-                host="127.0.0.1",
-                port="19530"
-            )
+            connection_params = {"alias": "default", "host": "127.0.0.1", "port": "19530"}
+            connections.connect(**connection_params)
+            self._connection_params = connection_params
             print("Connected to Milvus Lite")
             self.milvus_connected = True
             
@@ -139,40 +367,22 @@ class RAGRetrieverAgent:
             
         try:
             # Quick check if port is open before attempting connection
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(2)  # 2 second timeout
-            result = sock.connect_ex((self.milvus_host, self.milvus_port))
-            sock.close()
-            
-            if result != 0:
+            if not self._probe_server():
                 print(f"Milvus server not reachable at {self.milvus_host}:{self.milvus_port}")
                 print("Running in mock mode without Milvus")
                 self.milvus_connected = False
                 return
             
-            # Attempt Milvus connection with timeout
-            connection_params = {
-                "alias": "default",
-                "host": self.milvus_host,
-                "port": str(self.milvus_port)
-            }
-            
-            # Add cloud credentials if provided
-            if self.milvus_user and self.milvus_password:
-                connection_params["user"] = self.milvus_user
-                connection_params["password"] = self.milvus_password
+            connection_params = self._server_params
+            if "user" in connection_params:
                 print(f"Connecting to cloud Milvus at {self.milvus_host}:{self.milvus_port} with credentials")
-            
-            if self.milvus_token:
-                connection_params["token"] = self.milvus_token
+            if "token" in connection_params:
                 print(f"Connecting to cloud Milvus with API token")
-                
-            if self.milvus_secure:
-                connection_params["secure"] = True
+            if connection_params.get("secure"):
                 print("Using secure connection (TLS/SSL)")
             
             connections.connect(**connection_params)
+            self._connection_params = connection_params
             print(f"Successfully connected to Milvus at {self.milvus_host}:{self.milvus_port}")
             self.milvus_connected = True
         except Exception as e:
@@ -180,6 +390,41 @@ class RAGRetrieverAgent:
             print("Running in mock mode without Milvus")
             self.milvus_connected = False
     
+    def _build_server_params(self) -> Dict[str, Any]:
+        """Connection parameters for a host/port Milvus server, including any credentials"""
+        connection_params = {
+            "alias": "default",
+            "host": self.milvus_host,
+            "port": str(self.milvus_port)
+        }
+        
+        # Add cloud credentials if provided
+        if self.milvus_user and self.milvus_password:
+            connection_params["user"] = self.milvus_user
+            connection_params["password"] = self.milvus_password
+        
+        if self.milvus_token:
+            connection_params["token"] = self.milvus_token
+            
+        if self.milvus_secure:
+            connection_params["secure"] = True
+        
+        return connection_params
+    
+    def _probe_server(self) -> bool:
+        """Check the Milvus port is open, reusing a successful probe from the last few seconds"""
+        now = time.monotonic()
+        if self._last_probe_ok and now - self._last_probe_ts < _PROBE_TTL_SECONDS:
+            return True
+        try:
+            with socket.create_connection((self.milvus_host, self.milvus_port), timeout=2):
+                pass
+            self._last_probe_ok = True
+        except OSError:
+            self._last_probe_ok = False
+        self._last_probe_ts = now
+        return self._last_probe_ok
+    
     def _connect_to_cloud_milvus(self):
         """Connect to cloud Milvus using URI and token"""
         try:
@@ -192,11 +437,9 @@ class RAGRetrieverAgent:
                 return
             
             print(f"Connecting to cloud Milvus: {uri}")
-            connections.connect(
-                alias="default",
-                uri=uri,
-                token=token
-            )
+            connection_params = {"alias": "default", "uri": uri, "token": token}
+            connections.connect(**connection_params)
+            self._connection_params = connection_params
             print("✅ Successfully connected to cloud Milvus!")
             self.milvus_connected = True
             
@@ -214,6 +457,12 @@ class RAGRetrieverAgent:
             if utility.has_collection(self.collection_name):
                 collection = Collection(self.collection_name)
                 collection.load()
+                if collection.indexes:
+                    index_params = collection.indexes[0].params
+                    self.metric_type = index_params.get("metric_type", self.metric_type)
+                    self.index_type = index_params.get("index_type", self.index_type)
+                if any(field.name == "text_snippet" for field in collection.schema.fields):
+                    self.text_field = "text_snippet"
                 return collection
             else:
                 print(f"Collection {self.collection_name} not found. Please run the setup script to create it.")
@@ -222,65 +471,172 @@ class RAGRetrieverAgent:
             print(f"Error accessing collection: {e}")
             return None
     
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text"""
+    def _encode_text(self, text: str) -> np.ndarray:
+        """Encode one text as a read-only (cacheable) float32 unit vector"""
+        # Unit-normalized so IP and COSINE collections rank identically
+        embedding = self.embedding_model.encode(
+            text, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32, copy=False)
+        # Cached arrays are shared between callers, so make them immutable
+        embedding.flags.writeable = False
+        return embedding
+    
+    def generate_embedding(self, text: str) -> np.ndarray:
+        """Generate a float32 embedding for text, passed to Milvus without list conversion"""
         if self.embedding_model:
             try:
-                embedding = self.embedding_model.encode(text)
-                return embedding.tolist()
+                return self._encode_cached(text)
             except Exception as e:
                 print(f"Error generating embedding: {e}")
         
         # Fallback to hash-based mock embedding
-        import hashlib
-        hash_obj = hashlib.md5(text.encode())
-        hash_int = int(hash_obj.hexdigest()[:8], 16)
-        # Generate a deterministic 384-dimensional embedding
-        embedding = [(hash_int >> i) % 2 - 0.5 for i in range(384)]
+        # A 48-byte digest unpacks to exactly 384 bits, one per dimension, giving a
+        # deterministic +/-0.5 vector; unit-normalize it like the real embeddings
+        digest = hashlib.blake2b(text.encode(), digest_size=48).digest()
+        embedding = np.unpackbits(np.frombuffer(digest, dtype=np.uint8)).astype(np.float32) - 0.5
+        embedding /= np.linalg.norm(embedding)
         return embedding
     
-    def search_documents(self, query: str, top_k: int = 5) -> List[SearchResult]:
-        """Search for relevant documents in Milvus or file database"""
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for several texts in one batched encode call"""
+        if self.embedding_model and texts:
+            try:
+                # encode() length-sorts the batch internally and returns rows in input order
+                return self.embedding_model.encode(
+                    texts,
+                    batch_size=64,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                ).astype(np.float32, copy=False)
+            except Exception as e:
+                print(f"Error generating embeddings: {e}")
+        
+        return np.stack([self.generate_embedding(text) for text in texts])
+    
+    def search_documents(self, query: str, top_k: int = 5,
+                         query_embedding: Optional[np.ndarray] = None,
+                         profile: str = "balanced") -> List[SearchResult]:
+        """
+        Search for relevant documents in Milvus or file database.
+        
+        query_embedding skips re-encoding the query; profile selects an ANN_PROFILES entry.
+        """
         # Use cloud Milvus if connected, otherwise fallback to file-based
-        if self.milvus_connected and self.collection:
+        if self._ensure_connection():
             print(f"🔍 Searching cloud database for: '{query}'")
-            return self._search_milvus_collection(query, top_k)
+            if query_embedding is None:
+                query_embedding = self.generate_embedding(query)
+            return self._search_milvus_collection(query, query_embedding, top_k, profile)
         else:
             print(f"🔍 Searching file-based database for: '{query}'")
             return self._mock_search_results(query)
     
-    def _search_milvus_collection(self, query: str, top_k: int = 5) -> List[SearchResult]:
-        """Search the cloud Milvus collection"""
+    def search_documents_batch(self, queries: List[str], top_k: int = 5,
+                               profile: str = "balanced",
+                               query_embeddings: Optional[np.ndarray] = None) -> List[List[SearchResult]]:
+        """
+        Search for several queries with one embedding batch and one Milvus request.
+        
+        query_embeddings (one row per query) skips re-encoding the queries.
+        """
+        if not self._ensure_connection():
+            print(f"🔍 Searching file-based database for {len(queries)} queries")
+            return [self._mock_search_results(query) for query in queries]
+        
+        print(f"🔍 Searching cloud database for {len(queries)} queries")
         try:
-            # Generate query embedding
-            query_embedding = self.generate_embedding(query)
-            if not query_embedding:
+            if query_embeddings is None:
+                query_embeddings = self.generate_embeddings(queries)
+            results = self.collection.search(
+                data=query_embeddings,
+                anns_field="embedding",
+                param=self._search_params(profile),
+                limit=top_k,
+                output_fields=[self.text_field, "metadata"]
+            )
+            return [
+                self._hits_to_results(hits) or self._mock_search_results(query)
+                for query, hits in zip(queries, results)
+            ]
+        except Exception as e:
+            print(f"Error searching cloud database: {e}, using file fallback")
+            return [self._mock_search_results(query) for query in queries]
+    
+    async def search_documents_async(self, query: str, top_k: int = 5,
+                                     profile: str = "balanced") -> List[SearchResult]:
+        """Search without blocking the event loop, so independent searches overlap on the server"""
+        if not self._ensure_connection():
+            return self._mock_search_results(query)
+        
+        try:
+            query_embedding = await asyncio.to_thread(self.generate_embedding, query)
+            future = self.collection.search(
+                data=[query_embedding],
+                anns_field="embedding",
+                param=self._search_params(profile),
+                limit=top_k,
+                output_fields=[self.text_field, "metadata"],
+                _async=True
+            )
+            results = await asyncio.to_thread(future.result)
+            return self._hits_to_results(results[0]) or self._mock_search_results(query)
+        except Exception as e:
+            print(f"Error searching cloud database: {e}, using file fallback")
+            return self._mock_search_results(query)
+    
+    async def gather_searches(self, queries: List[str], top_k: int = 5,
+                              profile: str = "balanced") -> List[List[SearchResult]]:
+        """Run independent searches concurrently (use search_documents_batch to pack them into one request)"""
+        return await asyncio.gather(*[
+            self.search_documents_async(query, top_k, profile) for query in queries
+        ])
+    
+    def _search_params(self, profile: str = "balanced") -> Dict[str, Any]:
+        """Search parameters for the loaded collection's index at the given ANN profile"""
+        settings = ANN_PROFILES[profile]
+        if self.index_type == "FLAT":
+            params = {}
+        elif self.index_type.startswith("IVF"):
+            params = {"nprobe": settings["nprobe"]}
+        else:
+            # HNSW and AUTOINDEX
+            params = {"ef": settings["ef"]}
+        return {"metric_type": self.metric_type, "params": params}
+    
+    def _hits_to_results(self, hits) -> List[SearchResult]:
+        """Convert one query's Milvus hits into SearchResult objects"""
+        return [
+            SearchResult(
+                id=getattr(hit, 'id', 0),
+                text=hit.entity.get(self.text_field, ''),
+                metadata=hit.entity.get('metadata', {}),
+                similarity_score=float(hit.score),
+                snippet=self.text_field != "text"
+            )
+            for hit in hits
+        ]
+    
+    def _search_milvus_collection(self, query: str, query_embedding: np.ndarray,
+                                  top_k: int = 5, profile: str = "balanced") -> List[SearchResult]:
+        """Search the cloud Milvus collection with a precomputed query embedding"""
+        try:
+            if query_embedding is None or len(query_embedding) == 0:
                 print("Failed to generate embedding, using file fallback")
                 return self._mock_search_results(query)
             
             # Search in Milvus collection
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"ef": 64}  # For AUTOINDEX
-            }
-            
             results = self.collection.search(
                 data=[query_embedding],
                 anns_field="embedding",
-                param=search_params,
+                param=self._search_params(profile),
                 limit=top_k,
-                output_fields=["text", "metadata"]
+                output_fields=[self.text_field, "metadata"]
             )
             
             search_results = []
             if results and len(results[0]) > 0:
-                for hit in results[0]:
-                    search_results.append(SearchResult(
-                        id=getattr(hit, 'id', 0),
-                        text=hit.entity.get('text', ''),
-                        metadata=hit.entity.get('metadata', {}),
-                        similarity_score=float(hit.score)
-                    ))
+                search_results = self._hits_to_results(results[0])
                 print(f"📁 Found {len(search_results)} results from cloud database")
             else:
                 print("No results from cloud database, using file fallback")
@@ -292,52 +648,95 @@ class RAGRetrieverAgent:
             print(f"Error searching cloud database: {e}, using file fallback")
             return self._mock_search_results(query)
     
+    @staticmethod
+    def _build_file_index(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build token -> (document positions, score weights) postings for text, topic and filename.
+        
+        Text weights are precomputed BM25 term scores, so a query only sums postings.
+        """
+        text_postings: Dict[str, List[Tuple[int, int]]] = {}
+        boosts = {"topic": {}, "filename": {}}
+        doc_lengths = []
+        for pos, doc in enumerate(documents):
+            metadata = doc.get('metadata', {})
+            tokens = _TOKEN_RE.findall(doc.get('text', '').lower())
+            doc_lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                text_postings.setdefault(token, []).append((pos, tf))
+            for field in boosts:
+                for token in set(_TOKEN_RE.findall(metadata.get(field, '').lower())):
+                    boosts[field].setdefault(token, []).append(pos)
+        
+        n_docs = len(documents)
+        lengths = np.asarray(doc_lengths, dtype=np.float32)
+        avg_length = max(float(lengths.mean()), 1.0) if n_docs else 1.0
+        length_norm = 1 - _BM25_B + _BM25_B * lengths / avg_length
+        
+        text_index = {}
+        for token, postings in text_postings.items():
+            ids = np.fromiter((pos for pos, _ in postings), dtype=np.int64, count=len(postings))
+            tf = np.fromiter((tf for _, tf in postings), dtype=np.float32, count=len(postings))
+            idf = np.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            text_index[token] = (ids, idf * tf * (_BM25_K1 + 1) / (tf + _BM25_K1 * length_norm[ids]))
+        
+        return {
+            "documents": documents,
+            "text": text_index,
+            "topic": {token: (np.asarray(ids), _TOPIC_WEIGHT) for token, ids in boosts["topic"].items()},
+            "filename": {token: (np.asarray(ids), _FILENAME_WEIGHT) for token, ids in boosts["filename"].items()}
+        }
+    
+    @classmethod
+    def _load_file_index(cls, db_file: str) -> Optional[Dict[str, Any]]:
+        """Parse and index the file database once, re-reading only when its mtime changes"""
+        if not os.path.exists(db_file):
+            return None
+        mtime = os.path.getmtime(db_file)
+        if cls._file_index is None or cls._file_index_mtime != mtime:
+            with open(db_file, 'rb') as f:
+                raw = f.read()
+            db_data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+            cls._file_index = cls._build_file_index(db_data.get('documents', []))
+            cls._file_index_mtime = mtime
+        return cls._file_index
+    
     def _mock_search_results(self, query: str) -> List[SearchResult]:
         """Generate mock search results from file-based database or defaults"""
         # Try to load from file-based database
         try:
-            import json
             db_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'vector_database.json')
             
-            if os.path.exists(db_file):
-                with open(db_file, 'r') as f:
-                    db_data = json.load(f)
+            index = self._load_file_index(db_file)
+            if index is not None:
+                documents = index["documents"]
                 
-                documents = db_data.get('documents', [])
-                query_lower = query.lower()
+                # BM25 over the text plus topic/filename boosts, summed from precomputed postings
+                scores = np.zeros(len(documents), dtype=np.float32)
+                for word in _query_tokens(query):
+                    for field in ("text", "topic", "filename"):
+                        posting = index[field].get(word)
+                        if posting is not None:
+                            ids, weights = posting
+                            scores[ids] += weights
                 
-                # Simple keyword matching for relevance
-                scored_results = []
-                for doc in documents:
-                    text = doc['text'].lower()
-                    metadata = doc['metadata']
-                    
-                    # Calculate relevance score based on keyword matches
-                    score = 0.0
-                    query_words = query_lower.split()
-                    
-                    for word in query_words:
-                        if word in text:
-                            score += 0.3
-                        if word in metadata.get('topic', '').lower():
-                            score += 0.5
-                        if word in metadata.get('filename', '').lower():
-                            score += 0.4
-                    
-                    if score > 0:
-                        scored_results.append((score, doc))
-                
-                # Sort by relevance score
-                scored_results.sort(key=lambda x: x[0], reverse=True)
+                # Top k by score in O(D) without sorting every document, then order just
+                # those k; ties keep file order
+                matched = np.flatnonzero(scores > 0)
+                if len(matched) > _FALLBACK_TOP_K:
+                    kth = _FALLBACK_TOP_K - 1
+                    matched = matched[np.argpartition(-scores[matched], kth)[:_FALLBACK_TOP_K]]
+                top = matched[np.lexsort((matched, -scores[matched]))]
                 
                 # Convert to SearchResult objects
                 search_results = []
-                for score, doc in scored_results[:3]:  # Top 3 results
+                for pos in top:
+                    doc = documents[pos]
                     search_results.append(SearchResult(
                         id=doc['id'],
                         text=doc['text'],
                         metadata=doc['metadata'],
-                        similarity_score=min(score, 1.0)  # Cap at 1.0
+                        similarity_score=min(float(scores[pos]), 1.0)  # Cap at 1.0
                     ))
                 
                 if search_results:
@@ -350,93 +749,151 @@ class RAGRetrieverAgent:
             print(f"Error loading file database: {e}")
             print("Using hardcoded fallback data")
         
-        # Fallback to hardcoded mock results
-        mock_results = [
-            SearchResult(
-                id=1,
-                text="Our return policy allows returns within 30 days of purchase. Items must be in original condition with tags attached. Refunds are processed within 5-7 business days.",
-                metadata={"filename": "return_policy.pdf", "topic": "returns", "source": "policy_documents"},
-                similarity_score=0.85
-            ),
-            SearchResult(
-                id=2, 
-                text="For order tracking, please use your order number and email address on our tracking page. Orders typically ship within 1-2 business days and arrive within 5-7 days.",
-                metadata={"filename": "shipping_guide.pdf", "topic": "shipping", "source": "customer_service"},
-                similarity_score=0.78
-            ),
-            SearchResult(
-                id=3,
-                text="Our customer service team is available Monday-Friday 9AM-6PM EST. You can reach us via email at support@ecommerce.com or phone at 1-800-SHOP-NOW.",
-                metadata={"filename": "contact_info.pdf", "topic": "support", "source": "customer_service"}, 
-                similarity_score=0.72
-            )
-        ]
-        
-        # Filter mock results based on query relevance
-        query_lower = query.lower()
-        relevant_results = []
-        
-        for result in mock_results:
-            if any(word in result.text.lower() for word in query_lower.split()):
-                relevant_results.append(result)
+        # Fallback to hardcoded mock results whose tokens overlap the query
+        query_tokens = frozenset(_query_tokens(query))
+        relevant_results = list(islice(
+            (result for result, tokens in zip(_MOCK_RESULTS, _MOCK_TOKENS) if query_tokens & tokens),
+            _FALLBACK_TOP_K
+        ))
         
-        return relevant_results[:3] if relevant_results else mock_results[:1]
+        return relevant_results if relevant_results else list(_MOCK_RESULTS[:1])
+    
+    def _with_full_text(self, search_results: List[SearchResult]) -> List[SearchResult]:
+        """Replace snippet text of Milvus hits with the stored full text, fetched in one query for just those ids"""
+        ids = [result.id for result in search_results if result.snippet]
+        if not ids or not self.collection:
+            return search_results
+        try:
+            rows = self.collection.query(expr=f"id in {ids}", output_fields=["text"])
+            full_text = {row["id"]: row["text"] for row in rows}
+            return [
+                replace(result, text=full_text.get(result.id, result.text), snippet=False) if result.snippet else result
+                for result in search_results
+            ]
+        except Exception as e:
+            print(f"Error fetching full text: {e}, using snippets")
+            return search_results
+    
+    def _synthesis_messages(self, query: str, search_results: List[SearchResult]) -> List[Dict[str, str]]:
+        """Build the LLM messages for answering query from search_results"""
+        context = "\n\n".join(
+            "Document %d: %s" % (i, result.text) for i, result in enumerate(search_results, 1)
+        )
+        return [
+            self._SYSTEM_MESSAGE,
+            {"role": "user", "content": self._USER_TEMPLATE.format_map({"query": query, "context": context})}
+        ]
     
     def synthesize_answer(self, query: str, search_results: List[SearchResult]) -> str:
         """Generate a synthesized answer using LLM"""
+        return self._synthesize(query, search_results)[0]
+    
+    def _synthesize(self, query: str, search_results: List[SearchResult]) -> Tuple[str, bool]:
+        """Synthesized answer, and whether the LLM produced it (False for fallback and error texts)"""
         if not search_results:
-            return "I couldn't find any relevant information for your query. Please contact customer service for assistance."
-        
-        # Prepare context from search results
-        context_parts = []
-        for i, result in enumerate(search_results, 1):
-            context_parts.append(f"Document {i}: {result.text}")
+            return "I couldn't find any relevant information for your query. Please contact customer service for assistance.", False
         
-        context = "\n\n".join(context_parts)
+        try:
+            # temperature=0 keeps answers deterministic, which also lets the processor cache them
+            response = self.llm_processor.generate_completion(
+                self._synthesis_messages(query, search_results), max_tokens=300, temperature=0
+            )
+            return response, response != COMPLETION_ERROR_REPLY
+        except Exception as e:
+            print(f"Error generating synthesis: {e}")
+            # Fallback to simple concatenation
+            return f"Based on our documentation: {search_results[0].text}", False
+    
+    def synthesize_answer_stream(self, query: str, search_results: List[SearchResult]) -> Iterator[str]:
+        """Yield the synthesized answer in chunks as the LLM generates them"""
+        for chunk, _ in self._synthesize_stream(query, search_results):
+            yield chunk
+    
+    def _synthesize_stream(self, query: str, search_results: List[SearchResult]) -> Iterator[Tuple[str, bool]]:
+        """Answer chunks, each with whether the LLM produced it (False for fallback and error texts)"""
+        if not search_results:
+            yield "I couldn't find any relevant information for your query. Please contact customer service for assistance.", False
+            return
         
-        # Create messages for LLM
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a helpful customer service assistant. Use the provided context to answer the user's question accurately and concisely. If the context doesn't contain relevant information, say so clearly."
-            },
+        try:
+            for chunk in self.llm_processor.stream_completion(
+                self._synthesis_messages(query, search_results), max_tokens=300, temperature=0
+            ):
+                yield chunk, chunk != COMPLETION_ERROR_REPLY
+        except Exception as e:
+            print(f"Error generating synthesis: {e}")
+            yield f"Based on our documentation: {search_results[0].text}", False
+    
+    @staticmethod
+    def _format_sources(search_results: List[SearchResult]) -> List[Dict[str, Any]]:
+        """Source entries for a response, with text truncated to 200 characters"""
+        return [
             {
-                "role": "user", 
-                "content": f"Question: {query}\n\nContext:\n{context}\n\nPlease provide a helpful answer based on the context above."
+                "id": result.id,
+                "text": result.text[:200] + "..." if len(result.text) > 200 else result.text,
+                "metadata": result.metadata,
+                "similarity_score": result.similarity_score
             }
+            for result in search_results
         ]
+    
+    async def process_query_stream(self, query: str, context: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_query.
         
+        Yields {"sources": [...]} once the search finishes, then {"delta": "..."} chunks of
+        the answer as they arrive, so the first tokens reach the user before generation ends.
+        A cached answer is yielded as a single delta and a fully synthesized one is cached.
+        """
         try:
-            response = self.llm_processor.generate_completion(messages, max_tokens=300)
-            return response
+            # Encode and search off the event loop so other turns keep running meanwhile
+            query_embedding = await asyncio.to_thread(self.generate_embedding, query)
+            cached = self._answer_cache.get(query_embedding)
+            if cached is not None:
+                print("♻️ Reusing answer from a similar earlier query")
+                yield {"sources": cached["sources"]}
+                yield {"delta": cached["answer"]}
+                return
+            
+            search_results = await asyncio.to_thread(self.search_documents, query, 5, query_embedding)
+            sources = self._format_sources(search_results)
+            yield {"sources": sources}
+            
+            top_results = await asyncio.to_thread(self._with_full_text, search_results[:3])
+            chunks = self._synthesize_stream(query, top_results)
+            parts, synthesized = [], True
+            while True:
+                item = await asyncio.to_thread(next, chunks, None)
+                if item is None:
+                    break
+                chunk, from_llm = item
+                parts.append(chunk)
+                synthesized = synthesized and from_llm
+                yield {"delta": chunk}
+            
+            # Same policy as _answer: fallback and error texts are not cached
+            if synthesized and parts:
+                self._answer_cache.put(query_embedding, {
+                    "status": "success",
+                    "answer": "".join(parts),
+                    "sources": sources,
+                    "query": query
+                })
         except Exception as e:
-            print(f"Error generating synthesis: {e}")
-            # Fallback to simple concatenation
-            return f"Based on our documentation: {search_results[0].text}"
+            yield {"status": "error", "error": str(e), "query": query}
     
     def process_query(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Main entry point for processing RAG queries"""
         try:
-            # Search for relevant documents
-            search_results = self.search_documents(query, top_k=5)
-            
-            # Generate synthesized answer
-            answer = self.synthesize_answer(query, search_results)
+            query_embedding = self.generate_embedding(query)
+            cached = self._answer_cache.get(query_embedding)
+            if cached is not None:
+                print("♻️ Reusing answer from a similar earlier query")
+                return dict(cached, query=query)
             
-            return {
-                "status": "success",
-                "answer": answer,
-                "sources": [
-                    {
-                        "id": result.id,
-                        "text": result.text[:200] + "..." if len(result.text) > 200 else result.text,
-                        "metadata": result.metadata,
-                        "similarity_score": result.similarity_score
-                    }
-                    for result in search_results
-                ],
-                "query": query
-            }
+            # Search for relevant documents
+            search_results = self.search_documents(query, top_k=5, query_embedding=query_embedding)
+            return self._answer(query, query_embedding, search_results)
             
         except Exception as e:
             return {
@@ -444,18 +901,64 @@ class RAGRetrieverAgent:
                 "error": str(e),
                 "query": query
             }
+    
+    def process_queries(self, queries: List[str], context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Answer several queries, searching for all uncached ones with one embedding batch and one Milvus request"""
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        try:
+            query_embeddings = self.generate_embeddings(queries)
+            pending = []
+            for i, (query, query_embedding) in enumerate(zip(queries, query_embeddings)):
+                cached = self._answer_cache.get(query_embedding)
+                if cached is not None:
+                    responses[i] = dict(cached, query=query)
+                else:
+                    pending.append(i)
+            
+            if pending:
+                batch_results = self.search_documents_batch(
+                    [queries[i] for i in pending], top_k=5, query_embeddings=query_embeddings[pending]
+                )
+                for i, search_results in zip(pending, batch_results):
+                    responses[i] = self._answer(queries[i], query_embeddings[i], search_results)
+            return responses
+            
+        except Exception as e:
+            return [
+                response if response is not None else {"status": "error", "error": str(e), "query": query}
+                for query, response in zip(queries, responses)
+            ]
+    
+    def _answer(self, query: str, query_embedding: np.ndarray, search_results: List[SearchResult]) -> Dict[str, Any]:
+        """Synthesize and cache the response for one query from its search results"""
+        # Generate synthesized answer from the full text of the top 3 hits only
+        answer, synthesized = self._synthesize(query, self._with_full_text(search_results[:3]))
+        
+        response = {
+            "status": "success",
+            "answer": answer,
+            "sources": self._format_sources(search_results),
+            "query": query
+        }
+        # Fallback answers are not cached, so the next similar query tries the LLM again
+        if synthesized:
+            self._answer_cache.put(query_embedding, response)
+        return response
 
 
-# Global RAG agent instance
+# Global RAG agent instance, built once even when first requested from several threads
 _rag_agent_instance = None
+_rag_agent_lock = threading.Lock()
 
 def get_rag_agent() -> RAGRetrieverAgent:
     """Get singleton RAG agent instance"""
     global _rag_agent_instance
     if _rag_agent_instance is None:
-        _rag_agent_instance = RAGRetrieverAgent(
-            collection_name=os.getenv("MILVUS_COLLECTION_NAME", "ecommerce_docs"),
-            milvus_host=os.getenv("MILVUS_HOST", "localhost"),
-            milvus_port=int(os.getenv("MILVUS_PORT", "19530"))
-        )
-    return _rag_agent_instance
\ No newline at end of file
+        with _rag_agent_lock:
+            if _rag_agent_instance is None:
+                _rag_agent_instance = RAGRetrieverAgent(
+                    collection_name=os.getenv("MILVUS_COLLECTION_NAME", "ecommerce_docs"),
+                    milvus_host=os.getenv("MILVUS_HOST", "localhost"),
+                    milvus_port=int(os.getenv("MILVUS_PORT", "19530"))
+                )
+    return _rag_agent_instance
@@ -1,26 +1,57 @@
 """
 Transactional Agents for handling order, return, and product queries
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple
 from dataclasses import dataclass
+from collections import defaultdict
+from functools import lru_cache
 from datetime import datetime, timedelta
+import re
+import sys
 import json
-import uuid
+import secrets
 
+import numpy as np
 
-@dataclass
+
+# Identifier patterns, compiled once; each alternation replaces a list of per-case patterns
+_ORDER_ID_RE = re.compile(r'(?:ORDER|ORD)-\d+', re.IGNORECASE)
+_RETURN_ID_RE = re.compile(r'RET-[A-Z0-9]+', re.IGNORECASE)
+_PRODUCT_ID_RE = re.compile(r'PROD-\d+', re.IGNORECASE)
+
+# Intent keywords for process_query, one scan per query; each named group is an intent
+_ORDER_DISPATCH_RE = re.compile(r'(?P<track>track)|(?P<status>status|check)')
+_RETURN_DISPATCH_RE = re.compile(r'(?P<howto>how to return)|(?P<ret>ret-|return)|(?P<status>status)|(?P<start>initiate|start)')
+_PRODUCT_DISPATCH_RE = re.compile(r'(?P<stock>availab(?:ility|le)|stock)|(?P<search>search|find)|(?P<details>details|info)')
+
+# Lowercase alphanumeric runs used to index and query the product catalog
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+@lru_cache(maxsize=1024)
+def _fmt_date(d: datetime) -> str:
+    """Format a date as YYYY-MM-DD, once per distinct date"""
+    return d.strftime("%Y-%m-%d")
+
+
+# dataclass(slots=True) needs Python 3.10; older interpreters keep per-instance __dict__
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class Order:
     """Order data structure"""
     order_id: str
     customer_email: str
     status: str
-    items: List[Dict[str, Any]]
+    # Tuple so the shared mock orders cannot be changed through a response
+    items: Tuple[Dict[str, Any], ...]
     total_amount: float
     order_date: datetime
     estimated_delivery: datetime
 
 
-@dataclass 
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class Product:
     """Product data structure"""
     product_id: str
@@ -31,7 +62,7 @@ class Product:
     description: str
 
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class Return:
     """Return data structure"""
     return_id: str
@@ -42,61 +73,87 @@ class Return:
     return_date: datetime
 
 
+def _build_mock_orders() -> Dict[str, Order]:
+    """Build mock order data, once at import"""
+    orders = {}
+    
+    base_date = datetime.now()
+    
+    mock_orders_data = [
+        {
+            "order_id": "ORD-001",
+            "customer_email": "john@example.com",
+            "status": "shipped",
+            "items": [{"product": "Laptop", "quantity": 1, "price": 999.99}],
+            "total_amount": 999.99,
+            "days_ago": 3
+        },
+        {
+            "order_id": "ORD-002", 
+            "customer_email": "jane@example.com",
+            "status": "processing",
+            "items": [{"product": "Phone", "quantity": 1, "price": 599.99}],
+            "total_amount": 599.99,
+            "days_ago": 1
+        },
+        {
+            "order_id": "ORD-003",
+            "customer_email": "bob@example.com", 
+            "status": "delivered",
+            "items": [{"product": "Headphones", "quantity": 2, "price": 149.99}],
+            "total_amount": 299.98,
+            "days_ago": 7
+        }
+    ]
+    
+    for order_data in mock_orders_data:
+        order_date = base_date - timedelta(days=order_data["days_ago"])
+        estimated_delivery = order_date + timedelta(days=5)
+        
+        orders[order_data["order_id"]] = Order(
+            order_id=order_data["order_id"],
+            customer_email=order_data["customer_email"],
+            status=order_data["status"],
+            items=tuple(order_data["items"]),
+            total_amount=order_data["total_amount"],
+            order_date=order_date,
+            estimated_delivery=estimated_delivery
+        )
+    
+    return orders
+
+
+_MOCK_ORDERS = _build_mock_orders()
+
+
 class OrderStatusAgent:
     """Agent for handling order-related queries"""
     
-    def __init__(self):
-        # Mock order database
-        self.orders = self._generate_mock_orders()
+    # Order timelines by current status, copied into each tracking response
+    _TIMELINE_TEMPLATES = {
+        "processing": (
+            {"step": "Order Received", "status": "completed", "date": "2024-11-20"},
+            {"step": "Processing", "status": "current", "date": "2024-11-21"},
+            {"step": "Shipped", "status": "pending", "date": "2024-11-22"},
+            {"step": "Delivered", "status": "pending", "date": "2024-11-25"}
+        ),
+        "shipped": (
+            {"step": "Order Received", "status": "completed", "date": "2024-11-20"},
+            {"step": "Processing", "status": "completed", "date": "2024-11-21"},
+            {"step": "Shipped", "status": "current", "date": "2024-11-22"},
+            {"step": "Delivered", "status": "pending", "date": "2024-11-25"}
+        ),
+        "delivered": (
+            {"step": "Order Received", "status": "completed", "date": "2024-11-20"},
+            {"step": "Processing", "status": "completed", "date": "2024-11-21"}, 
+            {"step": "Shipped", "status": "completed", "date": "2024-11-22"},
+            {"step": "Delivered", "status": "completed", "date": "2024-11-24"}
+        )
+    }
     
-    def _generate_mock_orders(self) -> Dict[str, Order]:
-        """Generate mock order data"""
-        orders = {}
-        
-        base_date = datetime.now()
-        
-        mock_orders_data = [
-            {
-                "order_id": "ORD-001",
-                "customer_email": "john@example.com",
-                "status": "shipped",
-                "items": [{"product": "Laptop", "quantity": 1, "price": 999.99}],
-                "total_amount": 999.99,
-                "days_ago": 3
-            },
-            {
-                "order_id": "ORD-002", 
-                "customer_email": "jane@example.com",
-                "status": "processing",
-                "items": [{"product": "Phone", "quantity": 1, "price": 599.99}],
-                "total_amount": 599.99,
-                "days_ago": 1
-            },
-            {
-                "order_id": "ORD-003",
-                "customer_email": "bob@example.com", 
-                "status": "delivered",
-                "items": [{"product": "Headphones", "quantity": 2, "price": 149.99}],
-                "total_amount": 299.98,
-                "days_ago": 7
-            }
-        ]
-        
-        for order_data in mock_orders_data:
-            order_date = base_date - timedelta(days=order_data["days_ago"])
-            estimated_delivery = order_date + timedelta(days=5)
-            
-            orders[order_data["order_id"]] = Order(
-                order_id=order_data["order_id"],
-                customer_email=order_data["customer_email"],
-                status=order_data["status"],
-                items=order_data["items"],
-                total_amount=order_data["total_amount"],
-                order_date=order_date,
-                estimated_delivery=estimated_delivery
-            )
-        
-        return orders
+    def __init__(self):
+        # Mock order database, shared read-only with every instance
+        self.orders = _MOCK_ORDERS
     
     def get_order_status(self, order_id: str) -> Dict[str, Any]:
         """Get order status by ID"""
@@ -112,10 +169,10 @@ class OrderStatusAgent:
             "data": {
                 "order_id": order.order_id,
                 "status": order.status,
-                "items": order.items,
+                "items": [dict(item) for item in order.items],
                 "total_amount": order.total_amount,
-                "order_date": order.order_date.strftime("%Y-%m-%d"),
-                "estimated_delivery": order.estimated_delivery.strftime("%Y-%m-%d")
+                "order_date": _fmt_date(order.order_date),
+                "estimated_delivery": _fmt_date(order.estimated_delivery)
             }
         }
     
@@ -132,7 +189,7 @@ class OrderStatusAgent:
             "order_id": order_id,
             "current_status": order.status,
             "timeline": self._get_order_timeline(order.status),
-            "estimated_delivery": order.estimated_delivery.strftime("%Y-%m-%d")
+            "estimated_delivery": _fmt_date(order.estimated_delivery)
         }
         
         return {
@@ -141,29 +198,8 @@ class OrderStatusAgent:
         }
     
     def _get_order_timeline(self, current_status: str) -> List[Dict[str, Any]]:
-        """Get order timeline based on current status"""
-        timeline_templates = {
-            "processing": [
-                {"step": "Order Received", "status": "completed", "date": "2024-11-20"},
-                {"step": "Processing", "status": "current", "date": "2024-11-21"},
-                {"step": "Shipped", "status": "pending", "date": "2024-11-22"},
-                {"step": "Delivered", "status": "pending", "date": "2024-11-25"}
-            ],
-            "shipped": [
-                {"step": "Order Received", "status": "completed", "date": "2024-11-20"},
-                {"step": "Processing", "status": "completed", "date": "2024-11-21"},
-                {"step": "Shipped", "status": "current", "date": "2024-11-22"},
-                {"step": "Delivered", "status": "pending", "date": "2024-11-25"}
-            ],
-            "delivered": [
-                {"step": "Order Received", "status": "completed", "date": "2024-11-20"},
-                {"step": "Processing", "status": "completed", "date": "2024-11-21"}, 
-                {"step": "Shipped", "status": "completed", "date": "2024-11-22"},
-                {"step": "Delivered", "status": "completed", "date": "2024-11-24"}
-            ]
-        }
-        
-        return timeline_templates.get(current_status, [])
+        """Get order timeline based on current status, copied from the shared templates"""
+        return [dict(step) for step in self._TIMELINE_TEMPLATES.get(current_status, ())]
     
     def process_query(self, query: str, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Process order-related queries"""
@@ -172,7 +208,9 @@ class OrderStatusAgent:
         # Extract order ID if present
         order_id = self._extract_order_id(query)
         
-        if "track" in query_lower or "tracking" in query_lower:
+        intents = {match.lastgroup for match in _ORDER_DISPATCH_RE.finditer(query_lower)}
+        
+        if "track" in intents:
             if order_id:
                 return self.track_order(order_id)
             else:
@@ -181,7 +219,7 @@ class OrderStatusAgent:
                     "error": "Please provide an order ID to track your order"
                 }
         
-        elif "status" in query_lower or "check" in query_lower:
+        elif "status" in intents:
             if order_id:
                 return self.get_order_status(order_id)
             else:
@@ -198,28 +236,58 @@ class OrderStatusAgent:
     
     def _extract_order_id(self, query: str) -> Optional[str]:
         """Extract order ID from query text"""
-        import re
         # Look for patterns like ORD-001, ORDER-123, etc.
-        patterns = [
-            r'ORD-\d+',
-            r'ORDER-\d+', 
-            r'ord-\d+',
-            r'order-\d+'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
-            if match:
-                return match.group().upper()
-        
-        return None
+        match = _ORDER_ID_RE.search(query)
+        return match.group().upper() if match else None
+
+
+def _build_mock_returns() -> Dict[str, Return]:
+    """Build mock return data, once at import"""
+    returns = {}
+    
+    mock_returns_data = [
+        {
+            "return_id": "RET-001",
+            "order_id": "ORD-001", 
+            "product_id": "PROD-123",
+            "reason": "Wrong size",
+            "status": "processing"
+        },
+        {
+            "return_id": "RET-002",
+            "order_id": "ORD-002",
+            "product_id": "PROD-456", 
+            "reason": "Damaged item",
+            "status": "approved"
+        }
+    ]
+    
+    for return_data in mock_returns_data:
+        returns[return_data["return_id"]] = Return(
+            return_id=return_data["return_id"],
+            order_id=return_data["order_id"],
+            product_id=return_data["product_id"],
+            reason=return_data["reason"],
+            status=return_data["status"],
+            return_date=datetime.now() - timedelta(days=2)
+        )
+    
+    return returns
+
+
+_MOCK_RETURNS = _build_mock_returns()
 
 
 class ReturnAgent:
     """Agent for handling return-related queries"""
     
     def __init__(self):
-        self.returns = self._generate_mock_returns()
+        # Copied because initiate_return adds entries
+        self.returns = dict(_MOCK_RETURNS)
+        # order_id -> return_ids, kept in step with self.returns
+        self._returns_by_order: Dict[str, List[str]] = defaultdict(list)
+        for return_obj in self.returns.values():
+            self._returns_by_order[return_obj.order_id].append(return_obj.return_id)
         self.return_policy = {
             "return_window_days": 30,
             "conditions": [
@@ -234,42 +302,9 @@ class ReturnAgent:
             ]
         }
     
-    def _generate_mock_returns(self) -> Dict[str, Return]:
-        """Generate mock return data"""
-        returns = {}
-        
-        mock_returns_data = [
-            {
-                "return_id": "RET-001",
-                "order_id": "ORD-001", 
-                "product_id": "PROD-123",
-                "reason": "Wrong size",
-                "status": "processing"
-            },
-            {
-                "return_id": "RET-002",
-                "order_id": "ORD-002",
-                "product_id": "PROD-456", 
-                "reason": "Damaged item",
-                "status": "approved"
-            }
-        ]
-        
-        for return_data in mock_returns_data:
-            returns[return_data["return_id"]] = Return(
-                return_id=return_data["return_id"],
-                order_id=return_data["order_id"],
-                product_id=return_data["product_id"],
-                reason=return_data["reason"],
-                status=return_data["status"],
-                return_date=datetime.now() - timedelta(days=2)
-            )
-        
-        return returns
-    
     def initiate_return(self, order_id: str, product_id: str, reason: str) -> Dict[str, Any]:
         """Initiate a return request"""
-        return_id = f"RET-{uuid.uuid4().hex[:6].upper()}"
+        return_id = f"RET-{secrets.token_hex(3).upper()}"
         
         new_return = Return(
             return_id=return_id,
@@ -281,6 +316,7 @@ class ReturnAgent:
         )
         
         self.returns[return_id] = new_return
+        self._returns_by_order[order_id].append(return_id)
         
         return {
             "status": "success",
@@ -311,10 +347,14 @@ class ReturnAgent:
                 "order_id": return_obj.order_id,
                 "status": return_obj.status,
                 "reason": return_obj.reason,
-                "return_date": return_obj.return_date.strftime("%Y-%m-%d")
+                "return_date": _fmt_date(return_obj.return_date)
             }
         }
     
+    def get_returns_for_order(self, order_id: str) -> List[str]:
+        """Get the return IDs filed against an order"""
+        return list(self._returns_by_order.get(order_id, ()))
+    
     def get_return_policy(self) -> Dict[str, Any]:
         """Get return policy information"""
         return {
@@ -325,9 +365,10 @@ class ReturnAgent:
     def process_query(self, query: str, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Process return-related queries - mainly for return status checking"""
         query_lower = query.lower()
+        intents = {match.lastgroup for match in _RETURN_DISPATCH_RE.finditer(query_lower)}
         
         # Only handle specific return status checks and return initiation
-        if "status" in query_lower and ("ret-" in query_lower or "return" in query_lower):
+        if "status" in intents and ("ret" in intents or "howto" in intents):
             # Look for return ID
             return_id = self._extract_return_id(query)
             if return_id:
@@ -340,7 +381,7 @@ class ReturnAgent:
                     }
                 }
         
-        elif "initiate" in query_lower or "start" in query_lower or "how to return" in query_lower:
+        elif "start" in intents or "howto" in intents:
             return {
                 "status": "success",
                 "data": {
@@ -359,66 +400,87 @@ class ReturnAgent:
     
     def _extract_return_id(self, query: str) -> Optional[str]:
         """Extract return ID from query"""
-        import re
-        patterns = [r'RET-[A-Z0-9]+', r'ret-[a-z0-9]+']
-        
-        for pattern in patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
-            if match:
-                return match.group().upper()
-        
-        return None
+        match = _RETURN_ID_RE.search(query)
+        return match.group().upper() if match else None
+
+
+def _build_mock_products() -> Dict[str, Product]:
+    """Build mock product data, once at import"""
+    products = {}
+    
+    mock_products_data = [
+        {
+            "product_id": "PROD-001",
+            "name": "Gaming Laptop",
+            "price": 1299.99,
+            "stock_quantity": 15,
+            "category": "Electronics",
+            "description": "High-performance gaming laptop with RTX graphics"
+        },
+        {
+            "product_id": "PROD-002",
+            "name": "Wireless Headphones",
+            "price": 199.99,
+            "stock_quantity": 50,
+            "category": "Audio",
+            "description": "Premium noise-canceling wireless headphones"
+        },
+        {
+            "product_id": "PROD-003",
+            "name": "Smartphone",
+            "price": 699.99,
+            "stock_quantity": 0,
+            "category": "Electronics", 
+            "description": "Latest smartphone with advanced camera"
+        },
+        {
+            "product_id": "PROD-004",
+            "name": "Running Shoes",
+            "price": 129.99,
+            "stock_quantity": 25,
+            "category": "Sports",
+            "description": "Professional running shoes with premium comfort"
+        }
+    ]
+    
+    for product_data in mock_products_data:
+        products[product_data["product_id"]] = Product(**product_data)
+    
+    return products
+
+
+_MOCK_PRODUCTS = _build_mock_products()
 
 
 class ProductAgent:
     """Agent for handling product and inventory queries"""
     
     def __init__(self):
-        self.products = self._generate_mock_products()
-    
-    def _generate_mock_products(self) -> Dict[str, Product]:
-        """Generate mock product data"""
-        products = {}
-        
-        mock_products_data = [
-            {
-                "product_id": "PROD-001",
-                "name": "Gaming Laptop",
-                "price": 1299.99,
-                "stock_quantity": 15,
-                "category": "Electronics",
-                "description": "High-performance gaming laptop with RTX graphics"
-            },
-            {
-                "product_id": "PROD-002",
-                "name": "Wireless Headphones",
-                "price": 199.99,
-                "stock_quantity": 50,
-                "category": "Audio",
-                "description": "Premium noise-canceling wireless headphones"
-            },
-            {
-                "product_id": "PROD-003",
-                "name": "Smartphone",
-                "price": 699.99,
-                "stock_quantity": 0,
-                "category": "Electronics", 
-                "description": "Latest smartphone with advanced camera"
-            },
-            {
-                "product_id": "PROD-004",
-                "name": "Running Shoes",
-                "price": 129.99,
-                "stock_quantity": 25,
-                "category": "Sports",
-                "description": "Professional running shoes with premium comfort"
-            }
+        self.products = _MOCK_PRODUCTS
+        # Catalog row of each product; the columns below are parallel arrays in this order so
+        # stock and price filters run as vectorized masks
+        self._product_order = {product_id: i for i, product_id in enumerate(self.products)}
+        catalog = list(self.products.values())
+        self._product_ids = np.array([product.product_id for product in catalog], dtype=object)
+        self._prices = np.array([product.price for product in catalog], dtype=np.float64)
+        self._stock = np.array([product.stock_quantity for product in catalog], dtype=np.int32)
+        self._index = self._build_search_index()
+        # Lowercased name/category/description per row, NUL-separated so a match can't span fields
+        self._search_blobs = [
+            f"{product.name.lower()}\x00{product.category.lower()}\x00{product.description.lower()}"
+            for product in catalog
         ]
-        
-        for product_data in mock_products_data:
-            products[product_data["product_id"]] = Product(**product_data)
-        
-        return products
+        # Per-instance LRU of search results keyed by the lowercased query; the catalog is static
+        self._find_products_cached = lru_cache(maxsize=512)(self._find_products)
+    
+    def _build_search_index(self) -> Dict[str, Set[str]]:
+        """Build a token -> product_id inverted index over name, category and description"""
+        index: Dict[str, Set[str]] = defaultdict(set)
+        for product in self.products.values():
+            text = f"{product.name} {product.category} {product.description}".lower()
+            for token in _WORD_RE.findall(text):
+                index[token].add(product.product_id)
+        return index
     
     def check_availability(self, product_id: str) -> Dict[str, Any]:
         """Check product availability"""
@@ -428,43 +490,62 @@ class ProductAgent:
                 "error": f"Product {product_id} not found"
             }
         
-        product = self.products[product_id]
-        is_available = product.stock_quantity > 0
+        row = self._product_order[product_id]
+        stock_quantity = int(self._stock[row])
         
         return {
             "status": "success",
             "data": {
-                "product_id": product.product_id,
-                "name": product.name,
-                "available": is_available,
-                "stock_quantity": product.stock_quantity,
-                "price": product.price
+                "product_id": product_id,
+                "name": self.products[product_id].name,
+                "available": stock_quantity > 0,
+                "stock_quantity": stock_quantity,
+                "price": float(self._prices[row])
             }
         }
     
-    def search_products(self, query: str) -> Dict[str, Any]:
+    def search_products(self, query: str, in_stock_only: bool = False) -> Dict[str, Any]:
         """Search products by name or category"""
-        query_lower = query.lower()
-        matching_products = []
-        
-        for product in self.products.values():
-            if (query_lower in product.name.lower() or 
-                query_lower in product.category.lower() or
-                query_lower in product.description.lower()):
-                matching_products.append({
-                    "product_id": product.product_id,
-                    "name": product.name,
-                    "price": product.price,
-                    "category": product.category,
-                    "available": product.stock_quantity > 0,
-                    "stock_quantity": product.stock_quantity
-                })
+        # Copy the cached entries so callers can't alter what later searches return
+        matching_products = [dict(product) for product in self._find_products_cached(query.lower(), in_stock_only)]
         
         return {
             "status": "success",
             "data": matching_products
         }
     
+    def _find_products(self, query_lower: str, in_stock_only: bool = False) -> Tuple[Dict[str, Any], ...]:
+        """Match a lowercased query against the catalog"""
+        tokens = _WORD_RE.findall(query_lower)
+        product_ids = set()
+        
+        if tokens:
+            # Products containing every query token, from intersecting posting sets
+            postings = sorted((self._index.get(token, set()) for token in tokens), key=len)
+            product_ids = set(postings[0]).intersection(*postings[1:])
+        
+        if product_ids:
+            rows = np.sort(np.fromiter((self._product_order[product_id] for product_id in product_ids), dtype=np.intp, count=len(product_ids)))
+        else:
+            # Partial words ("phone" in "Smartphone", "head") only match as substrings
+            rows = np.fromiter((i for i, blob in enumerate(self._search_blobs) if query_lower in blob), dtype=np.intp)
+        
+        if in_stock_only:
+            rows = rows[self._stock[rows] > 0]
+        
+        products = [self.products[product_id] for product_id in self._product_ids[rows]]
+        return tuple(
+            {
+                "product_id": product.product_id,
+                "name": product.name,
+                "price": float(price),
+                "category": product.category,
+                "available": bool(stock > 0),
+                "stock_quantity": int(stock)
+            }
+            for product, price, stock in zip(products, self._prices[rows], self._stock[rows])
+        )
+    
     def get_product_details(self, product_id: str) -> Dict[str, Any]:
         """Get detailed product information"""
         if product_id not in self.products:
@@ -494,16 +575,18 @@ class ProductAgent:
         # Extract product ID if present
         product_id = self._extract_product_id(query)
         
-        if "availability" in query_lower or "stock" in query_lower or "available" in query_lower:
+        intents = {match.lastgroup for match in _PRODUCT_DISPATCH_RE.finditer(query_lower)}
+        
+        if "stock" in intents:
             if product_id:
                 return self.check_availability(product_id)
             else:
                 return self.search_products(query)
         
-        elif "search" in query_lower or "find" in query_lower:
+        elif "search" in intents:
             return self.search_products(query)
         
-        elif "details" in query_lower or "info" in query_lower:
+        elif "details" in intents:
             if product_id:
                 return self.get_product_details(product_id)
             else:
@@ -518,39 +601,23 @@ class ProductAgent:
     
     def _extract_product_id(self, query: str) -> Optional[str]:
         """Extract product ID from query"""
-        import re
-        patterns = [r'PROD-\d+', r'prod-\d+']
-        
-        for pattern in patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
-            if match:
-                return match.group().upper()
-        
-        return None
+        match = _PRODUCT_ID_RE.search(query)
+        return match.group().upper() if match else None
 
 
-# Global agent instances
-_order_agent_instance = None
-_return_agent_instance = None
-_product_agent_instance = None
+# Global agent instances, built at import so the first request doesn't pay for the mock data
+_ORDER_AGENT = OrderStatusAgent()
+_RETURN_AGENT = ReturnAgent()
+_PRODUCT_AGENT = ProductAgent()
 
 def get_order_agent() -> OrderStatusAgent:
     """Get singleton order agent instance"""
-    global _order_agent_instance
-    if _order_agent_instance is None:
-        _order_agent_instance = OrderStatusAgent()
-    return _order_agent_instance
+    return _ORDER_AGENT
 
 def get_return_agent() -> ReturnAgent:
     """Get singleton return agent instance"""
-    global _return_agent_instance
-    if _return_agent_instance is None:
-        _return_agent_instance = ReturnAgent()
-    return _return_agent_instance
+    return _RETURN_AGENT
 
 def get_product_agent() -> ProductAgent:
     """Get singleton product agent instance"""
-    global _product_agent_instance
-    if _product_agent_instance is None:
-        _product_agent_instance = ProductAgent()
-    return _product_agent_instance
\ No newline at end of file
+    return _PRODUCT_AGENT
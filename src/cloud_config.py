@@ -2,11 +2,14 @@
 Cloud database configuration utilities
 """
 import os
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping
 
-def load_cloud_config() -> Dict[str, Any]:
-    """Load cloud database configuration from environment variables"""
-    return {
+@lru_cache(maxsize=None)
+def load_cloud_config() -> Mapping[str, Any]:
+    """Load cloud database configuration from environment variables (read once, returned read-only)"""
+    return MappingProxyType({
         'milvus_host': os.getenv('MILVUS_HOST', 'localhost'),
         'milvus_port': int(os.getenv('MILVUS_PORT', '19530')),
         'milvus_user': os.getenv('MILVUS_USER'),
@@ -14,7 +17,7 @@ def load_cloud_config() -> Dict[str, Any]:
         'milvus_token': os.getenv('MILVUS_TOKEN'),
         'milvus_secure': os.getenv('MILVUS_SECURE', 'false').lower() == 'true',
         'collection_name': os.getenv('MILVUS_COLLECTION_NAME', 'ecommerce_docs')
-    }
+    })
 
 def create_rag_agent_with_cloud_config():
     """Create RAG agent with cloud configuration from environment"""
@@ -0,0 +1,128 @@
+"""
+Embedding model loading shared by every script and module that encodes text.
+
+One set of environment variables configures the encoder everywhere:
+    EMBEDDING_BACKEND    - "torch" (default) or "onnx"
+    EMBEDDING_ONNX_PATH  - directory written by milvus_setup.export_onnx; implies ONNX
+    EMBEDDING_ONNX_FILE  - ONNX file inside the model (defaults below)
+    ST_THREADS           - torch CPU threads (default: cores, at most 8)
+    EMBEDDING_COMPILE    - "1" to torch.compile the PyTorch model
+
+The ONNX backend needs the extras in requirements-onnx.txt.
+"""
+import os
+import threading
+from typing import Optional
+import numpy as np
+
+# Model every caller encodes with unless it asks for another
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Graph-optimized ONNX file written by export_onnx inside its output directory
+ONNX_FILE_NAME = "onnx/model_O3.onnx"
+
+# int8-quantized ONNX file shipped with the hub model, used when no export directory is set
+HUB_ONNX_FILE_NAME = "onnx/model_quint8_avx2.onnx"
+
+# ONNX Runtime execution providers in order of preference
+_ONNX_PROVIDERS = ("TensorrtExecutionProvider", "CUDAExecutionProvider")
+
+# Encoders run with normalize_embeddings=True, so a real vector has unit norm
+_UNIT_NORM_TOLERANCE = 1e-3
+
+# Process-wide default encoder, loaded on first use
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+
+def select_device() -> str:
+    """Pick the fastest available torch device for encoding"""
+    import torch
+    if torch.cuda.is_available():
+        return 'cuda'
+    if torch.backends.mps.is_available():
+        return 'mps'
+    return 'cpu'
+
+
+def configure_cpu_threads():
+    """Set torch intra/inter-op threads for CPU encoding (ST_THREADS overrides the default)"""
+    import torch
+    torch.set_num_threads(int(os.getenv("ST_THREADS", min(os.cpu_count() or 4, 8))))
+    try:
+        torch.set_num_interop_threads(2)
+    except RuntimeError:
+        # Only settable before the first parallel op in the process
+        pass
+
+
+def maybe_compile(model):
+    """torch.compile the transformer when EMBEDDING_COMPILE=1, caching kernels across runs"""
+    import torch
+    if os.getenv("EMBEDDING_COMPILE") != "1" or not hasattr(torch, 'compile'):
+        return model
+    # Inductor reuses kernels compiled by earlier runs from this directory
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.expanduser("~/.cache/torch-inductor"))
+    model.eval()
+    transformer = model._first_module()
+    transformer.auto_model = torch.compile(transformer.auto_model, mode='reduce-overhead')
+    # Trigger compilation now so the first real encode hits the compiled graph
+    model.encode(['warmup'])
+    return model
+
+
+def is_model_embedding(vector, dim: int) -> bool:
+    """Whether a stored vector looks like a real normalized encoding rather than a placeholder"""
+    if vector is None or len(vector) != dim:
+        return False
+    vector = np.asarray(vector, dtype=np.float32)
+    # Constant mock vectors are all parallel, so search cannot rank them
+    return bool(np.ptp(vector) > 0) and abs(float(np.linalg.norm(vector)) - 1.0) < _UNIT_NORM_TOLERANCE
+
+
+def load_embedding_model(model_name: str = DEFAULT_MODEL_NAME, device: Optional[str] = None,
+                         onnx_path: Optional[str] = None) -> "SentenceTransformer":
+    """
+    Load an encoder for inference.
+    
+    ONNX Runtime is used when onnx_path or EMBEDDING_ONNX_PATH names an export directory,
+    or EMBEDDING_BACKEND=onnx, preferring the TensorRT, then CUDA, execution provider; if
+    the ONNX model cannot be loaded it falls back to PyTorch. PyTorch runs in FP16 on
+    CUDA/MPS, otherwise on CPU with ST_THREADS threads.
+    """
+    from sentence_transformers import SentenceTransformer
+    
+    onnx_path = onnx_path or os.getenv("EMBEDDING_ONNX_PATH")
+    if onnx_path or os.getenv("EMBEDDING_BACKEND", "torch").lower() == "onnx":
+        onnx_file = os.getenv("EMBEDDING_ONNX_FILE", ONNX_FILE_NAME if onnx_path else HUB_ONNX_FILE_NAME)
+        try:
+            import onnxruntime
+            available = onnxruntime.get_available_providers()
+            provider = next((p for p in _ONNX_PROVIDERS if p in available), "CPUExecutionProvider")
+            return SentenceTransformer(
+                onnx_path or model_name,
+                backend="onnx",
+                model_kwargs={"provider": provider, "file_name": onnx_file}
+            )
+        except Exception as e:
+            print(f"ONNX model unavailable ({e}), using PyTorch; install requirements-onnx.txt for ONNX")
+    
+    device = device or select_device()
+    if device == 'cpu':
+        configure_cpu_threads()
+    model = SentenceTransformer(model_name, device=device)
+    if device != 'cpu':
+        # Half precision halves weight bandwidth on GPU/MPS
+        model.half()
+    return maybe_compile(model)
+
+
+def get_embedding_model() -> "SentenceTransformer":
+    """Get the process-wide default encoder, loading it on first use"""
+    global _MODEL
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                _MODEL = load_embedding_model()
+                print(f"✅ Loaded embedding model on {_MODEL.device}")
+    return _MODEL
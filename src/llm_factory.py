@@ -2,20 +2,104 @@
 LLM Processor Factory with singleton pattern for (provider, model) pairs
 """
 import os
-from typing import Dict, Tuple, Optional, Any
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional, Any, Iterator
 from abc import ABC, abstractmethod
+import numpy as np
+import httpx
 import openai
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from embedding_runtime import get_embedding_model
+
 load_dotenv()
 
+# HTTP/2 needs the optional h2 package; without it the pooled client stays on HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Returned in place of a completion when the provider call fails
+COMPLETION_ERROR_REPLY = "I apologize, but I'm unable to process your request at the moment. Please try again later or contact customer support."
+
+# Canned replies used when no provider client is configured, checked in priority order
+_MOCK_RE = re.compile(r'(?P<policy>return policy)|(?P<ship>shipping)|(?P<order>order)', re.IGNORECASE)
+_MOCK_REPLIES = {
+    "policy": "Our return policy allows returns within 30 days of purchase. Items must be in original condition with tags attached. Refunds are processed within 5-7 business days.",
+    "ship": "We offer standard shipping (5-7 business days) and expedited shipping (2-3 business days). Free shipping on orders over $50.",
+    "order": "You can track your order using the order number and email address provided at checkout. Orders typically ship within 1-2 business days.",
+    None: "Thank you for your question. I'm here to help with information about our policies, orders, returns, and products."
+}
+
+
+def _mock_reply(message: str) -> str:
+    """Pick a canned reply for a message from one regex scan"""
+    topics = {match.lastgroup for match in _MOCK_RE.finditer(message)}
+    topic = next((key for key in ("policy", "ship", "order") if key in topics), None)
+    return _MOCK_REPLIES[topic]
+
+
+def _mock_embedding(text: str) -> list:
+    """Generate a deterministic 384-dimensional embedding for when no provider is available"""
+    seed = int.from_bytes(hashlib.md5(text.encode()).digest()[:4], "little")
+    rng = np.random.default_rng(seed)
+    return (rng.random(384, dtype=np.float32) - 0.5).tolist()
+
+
+class _TTLCache:
+    """Small LRU mapping whose entries expire after ttl seconds"""
+    
+    def __init__(self, maxsize: int = 512, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
 
 class LLMProcessor(ABC):
     """Abstract base class for LLM processors"""
     
     def __init__(self, model: str):
         self.model = model
+        # Recent completions for repeated prompts (greetings, policy questions, ...)
+        self._resp_cache = _TTLCache(maxsize=512, ttl=300)
+    
+    def _response_cache_key(self, messages: list, kwargs: Dict[str, Any]) -> Optional[Tuple[str, bytes]]:
+        """Cache key for a completion request, or None unless temperature is explicitly 0"""
+        # Unset temperature means the provider's default, which samples
+        if kwargs.get("temperature") != 0:
+            return None
+        payload = json.dumps([messages, kwargs], sort_keys=True, default=str).encode()
+        return (self.model, hashlib.blake2b(payload, digest_size=16).digest())
     
     @abstractmethod
     def generate_completion(self, messages: list, **kwargs) -> str:
@@ -23,9 +107,17 @@ class LLMProcessor(ABC):
         pass
     
     @abstractmethod
+    def generate_embeddings(self, texts: list) -> list:
+        """Generate embeddings for a batch of texts in one provider call"""
+        pass
+    
     def generate_embedding(self, text: str) -> list:
         """Generate embeddings for text"""
-        pass
+        return self.generate_embeddings([text])[0]
+    
+    def stream_completion(self, messages: list, **kwargs) -> Iterator[str]:
+        """Yield a completion in text chunks as they are generated (default: one chunk)"""
+        yield self.generate_completion(messages, **kwargs)
 
 
 class OpenAIProcessor(LLMProcessor):
@@ -38,21 +130,24 @@ class OpenAIProcessor(LLMProcessor):
             print("Warning: No valid OpenAI API key found. Using mock responses.")
             self.client = None
         else:
-            self.client = openai.OpenAI(api_key=api_key)
+            # One pooled keep-alive client per processor so TCP/TLS handshakes are amortized
+            http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_keepalive_connections=20)
+            )
+            self.client = openai.OpenAI(api_key=api_key, http_client=http_client)
     
     def generate_completion(self, messages: list, **kwargs) -> str:
         """Generate completion using OpenAI"""
         if not self.client:
             # Return mock response when API is not available
-            last_message = messages[-1].get("content", "")
-            if "return policy" in last_message.lower():
-                return "Our return policy allows returns within 30 days of purchase. Items must be in original condition with tags attached. Refunds are processed within 5-7 business days."
-            elif "shipping" in last_message.lower():
-                return "We offer standard shipping (5-7 business days) and expedited shipping (2-3 business days). Free shipping on orders over $50."
-            elif "order" in last_message.lower():
-                return "You can track your order using the order number and email address provided at checkout. Orders typically ship within 1-2 business days."
-            else:
-                return "Thank you for your question. I'm here to help with information about our policies, orders, returns, and products."
+            return _mock_reply(messages[-1].get("content", ""))
+        
+        cache_key = self._response_cache_key(messages, kwargs)
+        if cache_key is not None:
+            cached = self._resp_cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         try:
             response = self.client.chat.completions.create(
@@ -60,36 +155,52 @@ class OpenAIProcessor(LLMProcessor):
                 messages=messages,
                 **kwargs
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            if cache_key is not None and content is not None:
+                self._resp_cache.put(cache_key, content)
+            return content
         except Exception as e:
             print(f"OpenAI API error: {str(e)}")
-            return "I apologize, but I'm unable to process your request at the moment. Please try again later or contact customer support."
+            return COMPLETION_ERROR_REPLY
     
-    def generate_embedding(self, text: str) -> list:
-        """Generate embeddings using OpenAI"""
+    def stream_completion(self, messages: list, **kwargs) -> Iterator[str]:
+        """Stream completion chunks from OpenAI"""
         if not self.client:
-            # Return mock embedding when API is not available
-            import hashlib
-            hash_obj = hashlib.md5(text.encode())
-            hash_int = int(hash_obj.hexdigest()[:8], 16)
-            # Generate a deterministic 384-dimensional embedding
-            embedding = [(hash_int >> i) % 2 - 0.5 for i in range(384)]
-            return embedding
+            yield self.generate_completion(messages, **kwargs)
+            return
+        
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                **kwargs
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            print(f"OpenAI API error: {str(e)}")
+            yield COMPLETION_ERROR_REPLY
+    
+    def generate_embeddings(self, texts: list) -> list:
+        """Generate embeddings using OpenAI, one request for the whole batch"""
+        if not texts:
+            return []
+        if not self.client:
+            # Return mock embeddings when API is not available
+            return [_mock_embedding(text) for text in texts]
         
         try:
             response = self.client.embeddings.create(
                 model="text-embedding-ada-002",
-                input=text
+                input=texts
             )
-            return response.data[0].embedding
+            return [item.embedding for item in response.data]
         except Exception as e:
             print(f"OpenAI embedding error: {str(e)}")
             # Fallback to mock embedding
-            import hashlib
-            hash_obj = hashlib.md5(text.encode())
-            hash_int = int(hash_obj.hexdigest()[:8], 16)
-            embedding = [(hash_int >> i) % 2 - 0.5 for i in range(384)]
-            return embedding
+            return [_mock_embedding(text) for text in texts]
 
 
 class AnthropicProcessor(LLMProcessor):
@@ -108,15 +219,13 @@ class AnthropicProcessor(LLMProcessor):
         """Generate completion using Anthropic"""
         if not self.client:
             # Return mock response when API is not available
-            last_message = messages[-1].get("content", "")
-            if "return policy" in last_message.lower():
-                return "Our return policy allows returns within 30 days of purchase. Items must be in original condition with tags attached. Refunds are processed within 5-7 business days."
-            elif "shipping" in last_message.lower():
-                return "We offer standard shipping (5-7 business days) and expedited shipping (2-3 business days). Free shipping on orders over $50."
-            elif "order" in last_message.lower():
-                return "You can track your order using the order number and email address provided at checkout. Orders typically ship within 1-2 business days."
-            else:
-                return "Thank you for your question. I'm here to help with information about our policies, orders, returns, and products."
+            return _mock_reply(messages[-1].get("content", ""))
+        
+        cache_key = self._response_cache_key(messages, kwargs)
+        if cache_key is not None:
+            cached = self._resp_cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         try:
             # Convert OpenAI-style messages to Anthropic format
@@ -139,32 +248,59 @@ class AnthropicProcessor(LLMProcessor):
                 max_tokens=kwargs.get("max_tokens", 1000),
                 **{k: v for k, v in kwargs.items() if k != "max_tokens"}
             )
-            return response.content[0].text
+            content = response.content[0].text
+            if cache_key is not None:
+                self._resp_cache.put(cache_key, content)
+            return content
         except Exception as e:
             print(f"Anthropic API error: {str(e)}")
-            return "I apologize, but I'm unable to process your request at the moment. Please try again later or contact customer support."
+            return COMPLETION_ERROR_REPLY
     
-    def generate_embedding(self, text: str) -> list:
+    def stream_completion(self, messages: list, **kwargs) -> Iterator[str]:
+        """Stream completion chunks from Anthropic"""
+        if not self.client:
+            yield self.generate_completion(messages, **kwargs)
+            return
+        
+        try:
+            system_message = next((msg["content"] for msg in messages if msg["role"] == "system"), None)
+            formatted_messages = [
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in messages if msg["role"] != "system"
+            ]
+            with self.client.messages.stream(
+                model=self.model,
+                messages=formatted_messages,
+                system=system_message,
+                max_tokens=kwargs.get("max_tokens", 1000),
+                **{k: v for k, v in kwargs.items() if k != "max_tokens"}
+            ) as stream:
+                yield from stream.text_stream
+        except Exception as e:
+            print(f"Anthropic API error: {str(e)}")
+            yield COMPLETION_ERROR_REPLY
+    
+    def generate_embeddings(self, texts: list) -> list:
         """Anthropic doesn't provide embeddings, fallback to sentence-transformers or mock"""
+        if not texts:
+            return []
         try:
-            from sentence_transformers import SentenceTransformer
-            model = SentenceTransformer('all-MiniLM-L6-v2')
-            embedding = model.encode(text)
-            return embedding.tolist()
+            embeddings = get_embedding_model().encode(
+                texts, batch_size=64, show_progress_bar=False,
+                convert_to_numpy=True, normalize_embeddings=True
+            )
+            return embeddings.tolist()
         except Exception as e:
             print(f"Sentence transformer error: {e}")
             # Fallback to mock embedding
-            import hashlib
-            hash_obj = hashlib.md5(text.encode())
-            hash_int = int(hash_obj.hexdigest()[:8], 16)
-            embedding = [(hash_int >> i) % 2 - 0.5 for i in range(384)]
-            return embedding
+            return [_mock_embedding(text) for text in texts]
 
 
 class LLMProcessorFactory:
     """Factory for creating and managing LLM processors with singleton pattern"""
     
     _instances: Dict[Tuple[str, str], LLMProcessor] = {}
+    _lock = threading.Lock()
     
     @classmethod
     def get_processor(cls, provider: str, model: str) -> LLMProcessor:
@@ -174,10 +310,15 @@ class LLMProcessorFactory:
         """
         key = (provider.lower(), model)
         
-        if key not in cls._instances:
-            cls._instances[key] = cls._create_processor(provider, model)
+        # Lock-free hit; creation is serialized so concurrent first calls share one instance
+        processor = cls._instances.get(key)
+        if processor is None:
+            with cls._lock:
+                processor = cls._instances.get(key)
+                if processor is None:
+                    processor = cls._instances[key] = cls._create_processor(provider, model)
         
-        return cls._instances[key]
+        return processor
     
     @classmethod
     def _create_processor(cls, provider: str, model: str) -> LLMProcessor:
@@ -199,7 +340,8 @@ class LLMProcessorFactory:
     @classmethod
     def clear_instances(cls):
         """Clear all instances (for testing)"""
-        cls._instances.clear()
+        with cls._lock:
+            cls._instances.clear()
 
 
 # Convenience function for getting default processor
@@ -4,10 +4,14 @@ Configures Milvus, generates embeddings, and inserts chunks with proper schema
 """
 import os
 import json
+import hashlib
+import uuid
 from typing import List, Dict, Any, Optional
 from dataclasses import asdict
 from datetime import datetime
 
+import numpy as np
+
 # Try importing dependencies
 try:
     from pymilvus import (
@@ -33,6 +37,36 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from text_processor import TextProcessor, TextChunk
 from llm_factory import get_default_processor
+from embedding_runtime import load_embedding_model, ONNX_FILE_NAME
+
+# Texts per encode() call when embedding a corpus, bounding the tokenized batch held in memory
+ENCODE_SLICE = 4096
+
+# Corpora larger than this are encoded by a multi-process pool spanning all GPUs or several CPU workers
+MULTI_PROCESS_MIN_CHUNKS = 20000
+
+# Mock-mode storage: chunk text/metadata as JSON plus a parallel (N, dim) float32 matrix
+MOCK_CHUNKS_FILE = "/home/ah0012/project/data/mock_embeddings.json"
+MOCK_MATRIX_FILE = "/home/ah0012/project/data/mock_embeddings.npy"
+
+# Vector index choices as (build params, search params):
+#   HNSW     - graph index, high recall at sub-ms latency, no nlist/nprobe tuning; keeps full
+#              float32 vectors plus graph links (~1.6 KB/vector at dim 384, M=16)
+#   IVF_PQ   - product-quantized codes, 384-dim float32 (1536 B) -> 48 B per vector; far less
+#              memory bandwidth per scan at some recall cost
+#   IVF_FLAT - exact distances inside the probed lists, full float32 storage
+INDEX_CONFIGS = {
+    "HNSW": ({"M": 16, "efConstruction": 200}, {"ef": 64}),
+    "IVF_PQ": ({"nlist": 1024, "m": 48, "nbits": 8}, {"nprobe": 16}),
+    "IVF_FLAT": ({"nlist": 128}, {"nprobe": 10}),
+}
+
+# Rows per collection.insert call; Milvus ingest throughput peaks around this batch size
+INSERT_BATCH = 10000
+
+# Ingest partitions kept per collection; older ones are dropped after each successful ingest
+# so repeated pipeline runs stay well under Milvus' per-collection partition limit
+MAX_INGEST_PARTITIONS = 4
 
 
 class MilvusManager:
@@ -43,7 +77,13 @@ class MilvusManager:
                  embedding_model: str = "all-MiniLM-L6-v2",
                  milvus_host: str = "localhost",
                  milvus_port: int = 19530,
-                 embedding_dim: int = 384):
+                 embedding_dim: int = 384,
+                 index_type: str = "HNSW",
+                 device: Optional[str] = None,
+                 onnx_path: Optional[str] = None):
+        
+        if index_type not in INDEX_CONFIGS:
+            raise ValueError(f"Unsupported index type: {index_type}")
         
         self.collection_name = collection_name
         self.embedding_model_name = embedding_model
@@ -51,11 +91,11 @@ class MilvusManager:
         self.milvus_port = milvus_port
         self.embedding_dim = embedding_dim
         
-        # Initialize embedding model
+        # Initialize embedding model; without onnx_path the loader reads EMBEDDING_ONNX_PATH now
         if SENTENCE_TRANSFORMERS_AVAILABLE:
             try:
-                self.embedding_model = SentenceTransformer(embedding_model)
-                print(f"Loaded embedding model: {embedding_model}")
+                self.embedding_model = load_embedding_model(embedding_model, device, onnx_path)
+                print(f"Loaded embedding model: {embedding_model} on {self.embedding_model.device}")
             except Exception as e:
                 print(f"Error loading embedding model: {e}")
                 self.embedding_model = None
@@ -66,8 +106,17 @@ class MilvusManager:
         # Initialize LLM processor for fallback embeddings
         self.llm_processor = get_default_processor()
         
+        # Parsed mock chunk file, reused while its mtime is unchanged
+        self._mock_chunks: Optional[List[Dict[str, Any]]] = None
+        self._mock_chunks_mtime: Optional[float] = None
+        
         # Milvus connection
         self.collection = None
+        # Embeddings are unit-normalized, so inner product equals cosine similarity; collections
+        # created before the switch keep COSINE until they are dropped and re-ingested
+        self.metric_type = "IP"
+        # Vector index built for new collections; an existing collection keeps its own
+        self.index_type = index_type
         if MILVUS_AVAILABLE:
             self._setup_milvus()
         else:
@@ -98,6 +147,10 @@ class MilvusManager:
                 # Load existing collection
                 collection = Collection(self.collection_name)
                 collection.load()
+                if collection.indexes:
+                    index_params = collection.indexes[0].params
+                    self.metric_type = index_params.get("metric_type", self.metric_type)
+                    self.index_type = index_params.get("index_type", self.index_type)
                 print(f"Loaded existing collection: {self.collection_name}")
                 return collection
             else:
@@ -151,9 +204,9 @@ class MilvusManager:
         
         # Create index on embedding field
         index_params = {
-            "index_type": "IVF_FLAT",
-            "metric_type": "COSINE",
-            "params": {"nlist": 128}
+            "index_type": self.index_type,
+            "metric_type": self.metric_type,
+            "params": INDEX_CONFIGS[self.index_type][0]
         }
         collection.create_index("embedding", index_params)
         
@@ -167,7 +220,7 @@ class MilvusManager:
         """Generate embedding for text"""
         if self.embedding_model:
             try:
-                embedding = self.embedding_model.encode(text)
+                embedding = self.embedding_model.encode(text, normalize_embeddings=True)
                 return embedding.tolist()
             except Exception as e:
                 print(f"Error generating embedding: {e}")
@@ -175,41 +228,80 @@ class MilvusManager:
         # Fallback to LLM-based embeddings or mock
         return self._generate_fallback_embedding(text)
     
+    def _start_encode_pool(self) -> Optional[Dict[str, Any]]:
+        """Start a sentence-transformers worker pool: one process per GPU, or a few CPU workers"""
+        if not self.embedding_model:
+            return None
+        try:
+            if str(self.embedding_model.device).startswith("cuda"):
+                return self.embedding_model.start_multi_process_pool()
+            workers = max(1, min(4, (os.cpu_count() or 2) // 2))
+            return self.embedding_model.start_multi_process_pool(["cpu"] * workers)
+        except Exception as e:
+            print(f"Could not start encoding pool, encoding in-process: {e}")
+            return None
+    
+    def encode_corpus(self, texts: List[str]) -> np.ndarray:
+        """Encode a large corpus across all GPUs or several CPU processes"""
+        pool = self._start_encode_pool()
+        try:
+            return self.generate_embeddings(texts, pool)
+        finally:
+            if pool is not None:
+                self.embedding_model.stop_multi_process_pool(pool)
+    
+    def generate_embeddings(self, texts: List[str], pool: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Generate float32 embeddings for many texts with batched encode calls"""
+        if self.embedding_model and texts and pool is not None:
+            try:
+                embeddings = np.asarray(
+                    self.embedding_model.encode_multi_process(texts, pool, batch_size=64),
+                    dtype=np.float32
+                )
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                return embeddings / np.maximum(norms, 1e-12)
+            except Exception as e:
+                print(f"Error in multi-process encoding, encoding in-process: {e}")
+        
+        if self.embedding_model and texts:
+            try:
+                # encode() length-sorts each call's inputs into padded mini-batches and returns
+                # rows in input order; slicing bounds the memory held per call
+                return np.concatenate([
+                    self.embedding_model.encode(
+                        texts[start:start + ENCODE_SLICE],
+                        batch_size=64,
+                        convert_to_numpy=True,
+                        normalize_embeddings=True,
+                        show_progress_bar=False
+                    )
+                    for start in range(0, len(texts), ENCODE_SLICE)
+                ]).astype(np.float32, copy=False)
+            except Exception as e:
+                print(f"Error generating embeddings: {e}")
+        
+        return np.array([self._generate_fallback_embedding(text) for text in texts], dtype=np.float32)
+    
     def _generate_fallback_embedding(self, text: str) -> List[float]:
         """Generate fallback embedding when sentence-transformers unavailable"""
         try:
             # Try using LLM processor if it supports embeddings
             if hasattr(self.llm_processor, 'generate_embedding'):
-                return self.llm_processor.generate_embedding(text)
+                embedding = np.asarray(self.llm_processor.generate_embedding(text), dtype=np.float32)
+                norm = np.linalg.norm(embedding)
+                return (embedding / norm if norm > 0 else embedding).tolist()
         except Exception as e:
             print(f"LLM embedding error: {e}")
         
-        # Generate mock embedding
-        import hashlib
-        import struct
-        
-        # Create deterministic "embedding" from text hash
-        text_hash = hashlib.md5(text.encode()).digest()
-        mock_embedding = []
-        
-        for i in range(0, self.embedding_dim * 4, 4):
-            if i + 4 <= len(text_hash) * (self.embedding_dim // (len(text_hash) // 4)):
-                chunk = text_hash[i % len(text_hash):(i % len(text_hash)) + 4]
-                if len(chunk) == 4:
-                    value = struct.unpack('f', chunk)[0] if len(chunk) == 4 else 0.0
-                    mock_embedding.append(float(value))
-                else:
-                    mock_embedding.append(0.0)
-            else:
-                mock_embedding.append(0.0)
-        
-        # Normalize to make it more realistic
-        import math
-        norm = math.sqrt(sum(x*x for x in mock_embedding))
+        # Generate mock embedding: expand the text hash to embedding_dim 32-bit words in one
+        # call, map them uniformly into [-0.5, 0.5), then unit-normalize
+        buf = hashlib.shake_128(text.encode()).digest(self.embedding_dim * 4)
+        mock_embedding = (np.frombuffer(buf, dtype="<u4") / 2.0**32 - 0.5).astype(np.float32)
+        norm = np.linalg.norm(mock_embedding)
         if norm > 0:
-            mock_embedding = [x/norm for x in mock_embedding]
+            mock_embedding /= norm
         
-        return mock_embedding[:self.embedding_dim]
+        return mock_embedding.tolist()
     
     def insert_chunks(self, chunks: List[TextChunk]) -> Dict[str, Any]:
         """Insert text chunks into Milvus collection"""
@@ -220,72 +312,103 @@ class MilvusManager:
             return self._mock_insert(chunks)
         
         try:
-            # Prepare data for insertion
-            embeddings = []
-            texts = []
-            metadata_list = []
-            
             print(f"Generating embeddings for {len(chunks)} chunks...")
             
-            for i, chunk in enumerate(chunks):
-                # Generate embedding
-                embedding = self.generate_embedding(chunk.text)
-                embeddings.append(embedding)
-                texts.append(chunk.text)
-                
-                # Prepare metadata
-                metadata = {
-                    "chunk_id": chunk.chunk_id,
-                    "filename": chunk.metadata.get("filename", ""),
-                    "topic": chunk.metadata.get("topic", ""),
-                    "source": chunk.metadata.get("source", ""),
-                    "word_count": chunk.word_count,
-                    "created_at": datetime.now().isoformat()
-                }
-                metadata_list.append(metadata)
-                
-                if (i + 1) % 10 == 0:
-                    print(f"Processed {i + 1}/{len(chunks)} chunks")
+            # Each ingest gets its own partition so it can later be dropped as a metadata operation;
+            # the timestamp orders partitions by age and the random suffix keeps concurrent ingests apart
+            partition_name = f"ingest_{datetime.now():%Y%m%d%H%M%S%f}_{uuid.uuid4().hex[:8]}"
+            self.collection.create_partition(partition_name)
             
-            # Insert into Milvus
-            insert_data = [embeddings, texts, metadata_list]
-            mr = self.collection.insert(insert_data)
+            # One worker pool for the whole ingest when the corpus is large enough to amortize it
+            pool = self._start_encode_pool() if len(chunks) > MULTI_PROCESS_MIN_CHUNKS else None
+            
+            try:
+                insert_ids = self._insert_batches(chunks, pool, partition_name)
+            finally:
+                if pool is not None:
+                    self.embedding_model.stop_multi_process_pool(pool)
             
-            # Flush to ensure data is persisted
+            # Flush once to ensure data is persisted
             self.collection.flush()
+            retired = self._retire_ingest_partitions()
             
             return {
                 "status": "success",
                 "inserted_count": len(chunks),
-                "insert_ids": mr.primary_keys
+                "insert_ids": insert_ids,
+                "partition": partition_name,
+                "retired_partitions": retired
             }
             
         except Exception as e:
             print(f"Error inserting chunks: {e}")
             return {"status": "error", "error": str(e)}
     
+    def _retire_ingest_partitions(self) -> List[str]:
+        """Drop all but the newest MAX_INGEST_PARTITIONS ingest partitions, returning the dropped names"""
+        ingest_partitions = sorted(p.name for p in self.collection.partitions if p.name.startswith("ingest_"))
+        retired = ingest_partitions[:-MAX_INGEST_PARTITIONS]
+        for name in retired:
+            # Only the dropped partition is released, so searches on the rest keep running
+            self.collection.partition(name).release()
+            self.collection.drop_partition(name)
+        return retired
+    
+    def _insert_batches(self, chunks: List[TextChunk], pool: Optional[Dict[str, Any]],
+                        partition_name: Optional[str] = None) -> List[int]:
+        """Encode and insert chunks in INSERT_BATCH slices, returning the new primary keys"""
+        insert_ids = []
+        
+        # Encode and insert one batch at a time so only INSERT_BATCH rows are held in memory
+        for start in range(0, len(chunks), INSERT_BATCH):
+            batch = chunks[start:start + INSERT_BATCH]
+            texts = [chunk.text for chunk in batch]
+            metadata_list = [
+                {
+                    "chunk_id": chunk.chunk_id,
+                    "filename": chunk.metadata.get("filename", ""),
+                    "topic": chunk.metadata.get("topic", ""),
+                    "source": chunk.metadata.get("source", ""),
+                    "word_count": chunk.word_count,
+                    "created_at": datetime.now().isoformat()
+                }
+                for chunk in batch
+            ]
+            embeddings = self.generate_embeddings(texts, pool)
+            
+            # Insert into Milvus
+            mr = self.collection.insert([embeddings, texts, metadata_list], partition_name=partition_name)
+            insert_ids.extend(mr.primary_keys)
+            print(f"Processed {start + len(batch)}/{len(chunks)} chunks")
+        
+        return insert_ids
+    
     def _mock_insert(self, chunks: List[TextChunk]) -> Dict[str, Any]:
         """Mock insertion for testing without Milvus"""
         print(f"Mock insertion of {len(chunks)} chunks")
         
+        embeddings = self.generate_embeddings([chunk.text for chunk in chunks])
+        
         # Save chunks to local file for testing
         chunks_data = []
-        for chunk in chunks:
+        for chunk, embedding in zip(chunks, embeddings):
             chunk_data = {
                 "chunk_id": chunk.chunk_id,
                 "text": chunk.text,
                 "metadata": chunk.metadata,
                 "word_count": chunk.word_count,
-                "embedding": self.generate_embedding(chunk.text)[:10]  # Just first 10 dims
+                "embedding": embedding[:10].tolist()  # Just first 10 dims
             }
             chunks_data.append(chunk_data)
         
         # Save to file
-        output_file = "/home/ah0012/project/data/mock_embeddings.json"
+        output_file = MOCK_CHUNKS_FILE
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
         with open(output_file, 'w') as f:
             json.dump(chunks_data, f, indent=2)
+        # Full vectors as one contiguous matrix, row i belonging to chunks_data[i]
+        np.save(MOCK_MATRIX_FILE, embeddings)
         
         print(f"Saved mock embeddings to {output_file}")
         
@@ -306,8 +429,8 @@ class MilvusManager:
             
             # Search parameters
             search_params = {
-                "metric_type": "COSINE",
-                "params": {"nprobe": 10}
+                "metric_type": self.metric_type,
+                "params": INDEX_CONFIGS.get(self.index_type, ({}, {}))[1]
             }
             
             # Perform search
@@ -336,36 +459,45 @@ class MilvusManager:
             print(f"Error searching: {e}")
             return self._mock_search(query, top_k)
     
+    def _load_mock_chunks(self) -> List[Dict[str, Any]]:
+        """Load the mock chunk file, parsing it again only when it changes"""
+        mtime = os.path.getmtime(MOCK_CHUNKS_FILE)
+        if self._mock_chunks is None or self._mock_chunks_mtime != mtime:
+            with open(MOCK_CHUNKS_FILE, 'r') as f:
+                self._mock_chunks = json.load(f)
+            self._mock_chunks_mtime = mtime
+        return self._mock_chunks
+    
     def _mock_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Mock search results for testing"""
         # Try to load mock data
-        mock_file = "/home/ah0012/project/data/mock_embeddings.json"
-        
-        if os.path.exists(mock_file):
+        if os.path.exists(MOCK_CHUNKS_FILE) and os.path.exists(MOCK_MATRIX_FILE):
             try:
-                with open(mock_file, 'r') as f:
-                    chunks_data = json.load(f)
-                
-                # Simple keyword matching for mock search
-                query_words = query.lower().split()
-                results = []
+                chunks_data = self._load_mock_chunks()
+                matrix = np.load(MOCK_MATRIX_FILE, mmap_mode='r')
                 
-                for chunk in chunks_data:
-                    text_lower = chunk['text'].lower()
-                    matches = sum(1 for word in query_words if word in text_lower)
+                if len(chunks_data) == len(matrix) and len(matrix) > 0 and top_k > 0:
+                    # Cosine similarity as one matrix-vector product over unit vectors
+                    query_embedding = np.asarray(self.generate_embedding(query), dtype=np.float32)
+                    norm = np.linalg.norm(query_embedding)
+                    if norm > 0:
+                        query_embedding /= norm
+                    scores = matrix @ query_embedding
                     
-                    if matches > 0:
-                        score = matches / len(query_words)
-                        results.append({
-                            "id": hash(chunk['chunk_id']) % 1000000,
-                            "text": chunk['text'],
-                            "metadata": chunk['metadata'],
-                            "similarity_score": score
-                        })
-                
-                # Sort by score and return top_k
-                results.sort(key=lambda x: x['similarity_score'], reverse=True)
-                return results[:top_k]
+                    # Top k without sorting every row, then order just those k
+                    k = min(top_k, len(scores))
+                    top = np.argpartition(-scores, k - 1)[:k]
+                    top = top[np.argsort(-scores[top], kind='stable')]
+                    
+                    return [
+                        {
+                            "id": hash(chunks_data[i]['chunk_id']) % 1000000,
+                            "text": chunks_data[i]['text'],
+                            "metadata": chunks_data[i]['metadata'],
+                            "similarity_score": float(scores[i])
+                        }
+                        for i in top
+                    ]
                 
             except Exception as e:
                 print(f"Error loading mock data: {e}")
@@ -403,8 +535,19 @@ class MilvusManager:
             return {"status": "error", "error": "Collection not available"}
         
         try:
-            # Delete all entities
-            self.collection.delete("")
+            # Drop every ingest partition (O(1) metadata each); partitions must be released first
+            ingest_partitions = [p.name for p in self.collection.partitions if p.name != "_default"]
+            if ingest_partitions:
+                self.collection.release()
+                for name in ingest_partitions:
+                    self.collection.drop_partition(name)
+                self.collection.load()
+            
+            # Rows inserted before partitioned ingest live in _default and still need a delete
+            default_partition = self.collection.partition("_default")
+            if default_partition is not None and default_partition.num_entities > 0:
+                self.collection.delete("id >= 0", partition_name="_default")
+            
             self.collection.flush()
             return {"status": "success", "message": "Collection cleared"}
         except Exception as e:
@@ -475,6 +618,17 @@ class DataPipeline:
         return test_results
 
 
+def export_onnx(output_dir: str, model_name: str = "all-MiniLM-L6-v2") -> str:
+    """Export the embedding model to an O3-optimized ONNX model for MilvusManager(onnx_path=...)"""
+    from sentence_transformers import export_optimized_onnx_model
+    
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save(output_dir)
+    export_optimized_onnx_model(model, "O3", output_dir)
+    print(f"Exported ONNX model to {os.path.join(output_dir, ONNX_FILE_NAME)}")
+    return output_dir
+
+
 def main():
     """Main function to run the setup"""
     print("Setting up Milvus database and embeddings...")
@@ -493,4 +647,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python src/milvus_setup.py export_onnx <output_dir>
+    if sys.argv[1:2] == ["export_onnx"]:
+        export_onnx(sys.argv[2] if len(sys.argv) > 2 else "models/all-MiniLM-L6-v2-onnx")
+    else:
+        main()
\ No newline at end of file
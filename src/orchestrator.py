@@ -6,8 +6,9 @@ import json
 import re
 import os
 import sys
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 from enum import Enum
 
 # Add current directory to Python path
@@ -15,6 +16,25 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from llm_factory import LLMProcessorFactory, get_default_processor
 
+# Query words for choosing a transactional tool; an id prefix like "prod-001" yields "prod-"
+_TOOL_TOKEN_RE = re.compile(r"[a-z]+-|[a-z0-9]+")
+
+# Optional multi-pattern matcher for the routing phrases
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Query words as matched against single-word routing keywords ('#' kept for "order #"-style ids)
+_QUERY_TOKEN_RE = re.compile(r"[a-z0-9#]+")
+
+
+def _with_singulars(tokens: Set[str]) -> Set[str]:
+    """Add the singular form of plural tokens ("orders", "faqs") so they match singular keywords"""
+    tokens.update([token[:-1] for token in tokens if token.endswith('s')])
+    return tokens
+
 
 class IntentType(Enum):
     """Intent types for routing"""
@@ -23,7 +43,7 @@ class IntentType(Enum):
     UNCLEAR = "unclear"
 
 
-@dataclass
+@dataclass(frozen=True)
 class RoutingResult:
     """Result of intent routing"""
     intent: IntentType
@@ -56,6 +76,24 @@ class Orchestrator:
             'refund status for order', 'cancel order #'
         }
         
+        # Single words are matched by set intersection with the query's tokens; only the
+        # multi-word phrases still need substring scans
+        self._rag_words = frozenset(k for k in self.rag_keywords if ' ' not in k)
+        self._rag_phrases = tuple(k for k in self.rag_keywords if ' ' in k)
+        self._transactional_words = frozenset(k for k in self.transactional_keywords if ' ' not in k)
+        self._transactional_phrases = tuple(k for k in self.transactional_keywords if ' ' in k)
+        self._phrase_automaton = self._build_phrase_automaton()
+        
+        # Transactional tool keywords in priority order
+        self._tool_category_words = (
+            ('inventory_tool', frozenset({'product', 'inventory', 'stock', 'availability', 'available', 'prod-', 'search', 'find', 'item'})),
+            ('order_tool', frozenset({'order', 'track', 'tracking', 'status', 'check'})),
+            ('returns_tool', frozenset({'return', 'refund', 'exchange'}))
+        )
+        
+        # Routing is a pure function of the normalized query, so repeat queries reuse the result
+        self._route_cached = lru_cache(maxsize=4096)(self._route)
+        
         # Tool mappings
         self.tool_mappings = {
             'order': 'order_tool',
@@ -74,11 +112,21 @@ class Orchestrator:
         2. ELSE IF query contains transactional keywords → transactional tool
         3. ELSE → ask for clarification
         """
-        query_lower = query.lower()
+        return self._route_cached(query.strip().lower())
+    
+    def clear_route_cache(self):
+        """Drop memoized routing decisions (for testing or after changing keywords)"""
+        self._route_cached.cache_clear()
+    
+    def _route(self, query_lower: str) -> RoutingResult:
+        """Route a normalized (stripped, lowercased) query"""
+        query_tokens = _with_singulars(set(_QUERY_TOKEN_RE.findall(query_lower)))
+        
+        rag_phrase_matches, transactional_phrase_matches = self._count_phrases(query_lower)
         
         # Check for RAG keywords first (higher priority)
-        rag_matches = sum(1 for keyword in self.rag_keywords if keyword in query_lower)
-        transactional_matches = sum(1 for keyword in self.transactional_keywords if keyword in query_lower)
+        rag_matches = len(query_tokens & self._rag_words) + rag_phrase_matches
+        transactional_matches = len(query_tokens & self._transactional_words) + transactional_phrase_matches
         
         if rag_matches > 0:
             return RoutingResult(
@@ -107,19 +155,38 @@ class Orchestrator:
                 reasoning="Defaulting to RAG for open-ended query - LLM will handle contextually"
             )
     
-    def _determine_transactional_tool(self, query: str) -> str:
-        """Determine which transactional tool to use"""
-        query_lower = query.lower()
+    def _build_phrase_automaton(self):
+        """Compile all routing phrases into one Aho-Corasick automaton labelled by intent"""
+        if not AHOCORASICK_AVAILABLE:
+            return None
+        automaton = ahocorasick.Automaton()
+        for phrase in self._rag_phrases:
+            automaton.add_word(phrase, ('rag', phrase))
+        for phrase in self._transactional_phrases:
+            automaton.add_word(phrase, ('transactional', phrase))
+        automaton.make_automaton()
+        return automaton
+    
+    def _count_phrases(self, query_lower: str) -> Tuple[int, int]:
+        """Count distinct RAG and transactional phrases in the query"""
+        if self._phrase_automaton is not None:
+            # One linear pass finds every phrase; a set counts each phrase once like the fallback
+            found = {value for _, value in self._phrase_automaton.iter(query_lower)}
+            rag = sum(1 for label, _ in found if label == 'rag')
+            return rag, len(found) - rag
+        return (sum(1 for phrase in self._rag_phrases if phrase in query_lower),
+                sum(1 for phrase in self._transactional_phrases if phrase in query_lower))
+    
+    def _determine_transactional_tool(self, query_lower: str) -> str:
+        """Determine which transactional tool to use from an already-lowercased query"""
+        tokens = _with_singulars(set(_TOOL_TOKEN_RE.findall(query_lower)))
         
         # Check for product/inventory related queries first
-        if any(word in query_lower for word in ['product', 'inventory', 'stock', 'availability', 'available', 'prod-', 'search', 'find', 'item']):
-            return 'inventory_tool'
-        elif any(word in query_lower for word in ['order', 'track', 'status', 'check']):
-            return 'order_tool'
-        elif any(word in query_lower for word in ['return', 'refund', 'exchange']):
-            return 'returns_tool'
-        else:
-            return 'inventory_tool'  # Default to inventory for unclear product queries
+        for tool_name, words in self._tool_category_words:
+            if not words.isdisjoint(tokens):
+                return tool_name
+        
+        return 'inventory_tool'  # Default to inventory for unclear product queries
     
     def process_query(self, query: str, user_context: Optional[Dict] = None) -> Dict[str, Any]:
         """
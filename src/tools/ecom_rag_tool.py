@@ -1,7 +1,7 @@
 """
 E-commerce RAG Tool - Interface for the RAG Retriever Agent
 """
-from typing import Dict, Any
+from typing import Dict, Any, List
 import sys
 import os
 
@@ -46,6 +46,26 @@ def ecom_rag_tool(query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         }
 
 
+def ecom_rag_tool_batch(queries: List[str], context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """
+    Batched ecom_rag_tool: one embedding batch and one Milvus search for all queries
+    
+    Returns:
+        One ecom_rag_tool result per query, in input order
+    """
+    try:
+        return get_rag_agent().process_queries(queries, context or {})
+    except Exception as e:
+        return [
+            {
+                "status": "error",
+                "error": f"RAG tool error: {str(e)}",
+                "query": query
+            }
+            for query in queries
+        ]
+
+
 # Tool metadata for registration
 TOOL_METADATA = {
     "name": "ecom_rag_tool",
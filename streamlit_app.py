@@ -4,10 +4,11 @@ Live chatbot running on localhost with session management
 """
 import streamlit as st
 import json
+import asyncio
 import sys
 import os
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Iterator
 
 # Add src to path for imports
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -16,6 +17,7 @@ sys.path.append(os.path.join(project_root, 'src'))
 # Import orchestrator components
 try:
     from orchestrator import get_orchestrator
+    from agents.rag_agent import RAGRetrieverAgent, get_rag_agent
     from tools.ecom_rag_tool import ecom_rag_tool
     from tools.order_tool import order_tool
     from tools.returns_tool import returns_tool
@@ -26,6 +28,20 @@ except ImportError as e:
     st.error(f"Orchestrator not available: {e}")
 
 
+def _iter_async(events: AsyncIterator[Any]) -> Iterator[Any]:
+    """Drain an async generator from Streamlit's synchronous script thread"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.close()
+
+
 class StreamlitChatbot:
     """Streamlit chatbot interface"""
     
@@ -44,6 +60,8 @@ class StreamlitChatbot:
         # Initialize orchestrator
         if ORCHESTRATOR_AVAILABLE:
             self.orchestrator = get_orchestrator()
+            # Open the Milvus channel and load the embedding model once per process
+            RAGRetrieverAgent.startup()
         else:
             self.orchestrator = None
     
@@ -173,8 +191,10 @@ class StreamlitChatbot:
             "timestamp": timestamp
         })
         
-        # Generate response
-        with st.spinner("🤔 Thinking..."):
+        # Show the new turn right away; knowledge-base answers stream into it as they are generated
+        with st.chat_message("user"):
+            st.markdown(user_input)
+        with st.chat_message("assistant"):
             response_data = self.process_query(user_input)
         
         # Add assistant response
@@ -199,7 +219,8 @@ class StreamlitChatbot:
         
         try:
             # Route query through orchestrator
-            routing_result = self.orchestrator.process_query(query, st.session_state.user_context)
+            with st.spinner("🤔 Thinking..."):
+                routing_result = self.orchestrator.process_query(query, st.session_state.user_context)
             
             # Handle different response types
             if isinstance(routing_result, dict) and "tool" in routing_result:
@@ -230,8 +251,13 @@ class StreamlitChatbot:
         
         try:
             if tool_name in self.tools:
-                # Execute the tool
-                tool_result = self.tools[tool_name](**tool_args)
+                if tool_name == "ecom_rag_tool":
+                    # Knowledge-base answers are written into the chat as they are generated
+                    tool_result = self.stream_rag_answer(tool_args)
+                else:
+                    # Execute the tool
+                    with st.spinner("🤔 Thinking..."):
+                        tool_result = self.tools[tool_name](**tool_args)
                 
                 # Format response based on tool result
                 content = self.format_tool_response(tool_result, tool_name)
@@ -256,6 +282,33 @@ class StreamlitChatbot:
                 "tool_info": {"error": str(e), "tool": tool_name}
             }
     
+    def stream_rag_answer(self, tool_args: Dict[str, Any]) -> Dict[str, Any]:
+        """Write a knowledge-base answer into the current chat message as the LLM generates it"""
+        query = tool_args["query"]
+        tool_result = {"status": "success", "answer": "", "sources": [], "query": query}
+        events = _iter_async(get_rag_agent().process_query_stream(query, tool_args.get("context")))
+        
+        # The first event carries the search results (or the error that stopped the search)
+        with st.spinner("🔍 Searching knowledge base..."):
+            first = next(events, {})
+        if "sources" not in first:
+            events.close()
+            tool_result.update(first)
+            return tool_result
+        tool_result["sources"] = first["sources"]
+        
+        def answer_chunks():
+            for event in events:
+                if "delta" in event:
+                    yield event["delta"]
+                else:
+                    tool_result.update(event)
+        
+        answer = st.write_stream(answer_chunks())
+        if tool_result["status"] == "success":
+            tool_result["answer"] = answer if isinstance(answer, str) else "".join(map(str, answer))
+        return tool_result
+    
     def format_tool_response(self, tool_result: Dict[str, Any], tool_name: str) -> str:
         """Format tool response for display"""
         if not tool_result:
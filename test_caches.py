@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the response caches in the RAG agent, LLM processors and product search
+"""
+import sys
+import asyncio
+from unittest import mock
+import numpy as np
+sys.path.append('src')
+
+from agents import rag_agent
+from agents.rag_agent import _AnswerCache, RAGRetrieverAgent, SearchResult
+from llm_factory import COMPLETION_ERROR_REPLY, OpenAIProcessor
+
+
+def _unit(seed: int, dim: int = 8) -> np.ndarray:
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_answer_cache_expires_entries():
+    """Entries older than the TTL are no longer returned"""
+    cache = _AnswerCache(capacity=4, dim=8, ttl=10.0)
+    clock = mock.Mock(return_value=100.0)
+    with mock.patch.object(rag_agent.time, "monotonic", clock):
+        cache.put(_unit(1), {"answer": "a"})
+        assert cache.get(_unit(1)) == {"answer": "a"}
+        clock.return_value = 111.0
+        assert cache.get(_unit(1)) is None
+
+
+def test_answer_cache_evicts_least_recently_used():
+    """A full cache replaces the least recently used slot, vector and response together"""
+    cache = _AnswerCache(capacity=2, dim=8)
+    cache.put(_unit(1), {"answer": "a"})
+    cache.put(_unit(2), {"answer": "b"})
+    cache.get(_unit(1))
+    cache.put(_unit(3), {"answer": "c"})
+    assert cache.get(_unit(1)) == {"answer": "a"}
+    assert cache.get(_unit(2)) is None
+    assert cache.get(_unit(3)) == {"answer": "c"}
+
+
+def test_failed_answers_are_not_cached():
+    """LLM errors and the concatenation fallback are recomputed on the next similar query"""
+    agent = RAGRetrieverAgent()
+    with mock.patch.object(agent.llm_processor, "generate_completion", return_value=COMPLETION_ERROR_REPLY):
+        agent.process_query("What is your return policy?")
+    with mock.patch.object(agent.llm_processor, "generate_completion", side_effect=RuntimeError("down")):
+        agent.process_query("What is your return policy?")
+    assert agent._answer_cache.get(agent.generate_embedding("What is your return policy?")) is None
+    
+    with mock.patch.object(agent.llm_processor, "generate_completion", return_value="30 days.") as completion:
+        agent.process_query("What is your return policy?")
+        response = agent.process_query("What is your return policy?")
+    assert response["answer"] == "30 days."
+    assert completion.call_count == 1
+
+
+def test_cached_responses_are_independent_copies():
+    """Editing a returned response, including its sources, does not change later cache hits"""
+    cache = _AnswerCache(capacity=4, dim=8)
+    response = {"answer": "a", "sources": [{"id": 1, "metadata": {"topic": "returns"}}]}
+    cache.put(_unit(1), response)
+    response["sources"].clear()
+    hit = cache.get(_unit(1))
+    hit["sources"][0]["metadata"]["topic"] = "changed"
+    assert cache.get(_unit(1))["sources"] == [{"id": 1, "metadata": {"topic": "returns"}}]
+
+
+def _collect_stream(agent, query):
+    async def collect():
+        return [event async for event in agent.process_query_stream(query)]
+    return asyncio.run(collect())
+
+
+def test_stream_path_uses_answer_cache():
+    """Streamed answers are cached, and a cached answer is streamed without calling the LLM"""
+    agent = RAGRetrieverAgent()
+    with mock.patch.object(agent.llm_processor, "stream_completion", return_value=iter(["30 ", "days."])) as stream:
+        first = _collect_stream(agent, "What is your return policy?")
+        second = _collect_stream(agent, "What is your return policy?")
+    assert stream.call_count == 1
+    assert "".join(event["delta"] for event in first if "delta" in event) == "30 days."
+    assert second[0]["sources"] == first[0]["sources"]
+    assert second[1:] == [{"delta": "30 days."}]
+    assert agent.process_query("What is your return policy?")["answer"] == "30 days."
+    
+    with mock.patch.object(agent.llm_processor, "stream_completion", return_value=iter([COMPLETION_ERROR_REPLY])):
+        _collect_stream(agent, "How long does shipping take?")
+    assert agent._answer_cache.get(agent.generate_embedding("How long does shipping take?")) is None
+
+
+def test_completion_cache_requires_zero_temperature():
+    """Only explicitly deterministic completions are cached"""
+    processor = OpenAIProcessor("gpt-3.5-turbo")
+    messages = [{"role": "user", "content": "hi"}]
+    for kwargs in ({}, {"temperature": None}, {"temperature": 0.7}):
+        assert processor._response_cache_key(messages, kwargs) is None, kwargs
+    assert processor._response_cache_key(messages, {"temperature": 0}) is not None
+    assert processor._response_cache_key(messages, {"temperature": 0.0}) is not None
+    
+    processor.client = mock.Mock()
+    processor.client.chat.completions.create.return_value.choices = [mock.Mock(**{"message.content": "hello"})]
+    for _ in range(2):
+        assert processor.generate_completion(messages, temperature=0) == "hello"
+        assert processor.generate_completion(messages) == "hello"
+    assert processor.client.chat.completions.create.call_count == 3
+
+
+def test_synthesis_completions_are_cached():
+    """Repeated synthesis of the same query and context reaches the provider once"""
+    agent = RAGRetrieverAgent()
+    processor = OpenAIProcessor("gpt-3.5-turbo")
+    processor.client = mock.Mock()
+    processor.client.chat.completions.create.return_value.choices = [mock.Mock(**{"message.content": "30 days."})]
+    agent.llm_processor = processor
+    results = [SearchResult(id=1, text="Returns are accepted within 30 days.", metadata={}, similarity_score=0.9)]
+    for _ in range(2):
+        assert agent._synthesize("What is your return policy?", results) == ("30 days.", True)
+    assert processor.client.chat.completions.create.call_count == 1
+    assert processor.client.chat.completions.create.call_args.kwargs["temperature"] == 0
+
+
+if __name__ == "__main__":
+    test_answer_cache_expires_entries()
+    test_answer_cache_evicts_least_recently_used()
+    test_failed_answers_are_not_cached()
+    test_cached_responses_are_independent_copies()
+    test_stream_path_uses_answer_cache()
+    test_completion_cache_requires_zero_temperature()
+    test_synthesis_completions_are_cached()
+    print("✅ Cache tests passed")
@@ -104,5 +104,25 @@ def test_chatbot_responses():
     print("   3. Try the example queries in the sidebar")
     print("\n✨ The chatbot should now return proper answers for all query types!")
 
+def test_process_user_queries_batches_rag():
+    """RAG queries in a batch share one search call; results stay in input order"""
+    from unittest import mock
+    from main import ECommerceOrchestrator
+    from agents.rag_agent import get_rag_agent
+    
+    app = ECommerceOrchestrator()
+    agent = get_rag_agent()
+    queries = ["What is your return policy?", "Track order ORD-001", "Explain the shipping guide"]
+    with mock.patch.object(agent, "search_documents_batch", wraps=agent.search_documents_batch) as batch, \
+         mock.patch.object(agent._answer_cache, "get", return_value=None):
+        results = app.process_user_queries(queries)
+    
+    batch.assert_called_once()
+    assert batch.call_args.args[0] == [queries[0], queries[2]]
+    assert [result.get("query") for result in (results[0], results[2])] == [queries[0], queries[2]]
+    assert results[0]["status"] == "success" and "answer" in results[0]
+    assert results[1]["status"] == "success" and "answer" not in results[1]
+
 if __name__ == "__main__":
-    test_chatbot_responses()
\ No newline at end of file
+    test_chatbot_responses()
+    test_process_user_queries_batches_rag()
\ No newline at end of file
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the data loaders' reuse of stored embeddings
+"""
+import os
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+sys.path.append('src')
+
+import load_data_to_cloud
+import simple_loader
+from embedding_runtime import is_model_embedding
+
+DIM = 384
+
+
+def _unit(seed: int) -> np.ndarray:
+    vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _encoded(texts):
+    return np.stack([_unit(len(text)) for text in texts])
+
+
+def test_placeholder_vectors_are_not_model_embeddings():
+    """Constant, unnormalized or wrongly sized vectors are treated as missing"""
+    assert is_model_embedding(_unit(1), DIM)
+    assert is_model_embedding(_unit(1).tolist(), DIM)
+    assert not is_model_embedding(None, DIM)
+    assert not is_model_embedding([0.1] * DIM, DIM)
+    assert not is_model_embedding(np.full(DIM, DIM ** -0.5), DIM)
+    assert not is_model_embedding(_unit(1) * 2, DIM)
+    assert not is_model_embedding(_unit(1)[:100], DIM)
+
+
+def test_cloud_loader_reencodes_placeholder_vectors():
+    """Only the real embedding is kept; placeholder and missing rows are encoded"""
+    real = _unit(7)
+    documents = [
+        {"text": "a", "metadata": {}, "embedding": real},
+        {"text": "bb", "metadata": {}, "embedding": [0.1] * DIM},
+        {"text": "ccc", "metadata": {}},
+    ]
+    encode = mock.Mock(side_effect=_encoded)
+    with mock.patch.object(load_data_to_cloud, "generate_embeddings", encode):
+        (embeddings, texts, _), = load_data_to_cloud.iter_column_batches(documents)
+    encode.assert_called_once_with(["bb", "ccc"])
+    assert texts == ["a", "bb", "ccc"]
+    np.testing.assert_array_equal(embeddings[0], real)
+    np.testing.assert_array_equal(embeddings[1:], _encoded(["bb", "ccc"]))
+
+
+def test_simple_loader_reencodes_placeholder_vectors():
+    """Placeholder sidecar rows are encoded before insertion"""
+    batch = [
+        ({"text": "a", "metadata": {}}, _unit(7)),
+        ({"text": "bb", "metadata": {}}, np.full(DIM, 0.2, dtype=np.float32)),
+    ]
+    collection = mock.Mock()
+    encode = mock.Mock(side_effect=_encoded)
+    with mock.patch.object(simple_loader, "_encode", encode):
+        assert simple_loader._insert_batch(collection, batch) == 2
+    encode.assert_called_once_with(["bb"])
+    inserted = collection.insert.call_args[0][0]["embedding"]
+    np.testing.assert_array_equal(inserted[1], _encoded(["bb"])[0])
+
+
+def test_simple_loader_rejects_mismatched_sidecars():
+    """A row-count mismatch between embeddings.npy and meta.jsonl fails before any insert"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'data'))
+        np.save(os.path.join(tmp, 'data', 'embeddings.npy'), np.stack([_unit(1), _unit(2)]))
+        with open(os.path.join(tmp, 'data', 'meta.jsonl'), 'w') as f:
+            f.write('{"text": "a", "metadata": {}}\n')
+        os.chdir(tmp)
+        try:
+            next(simple_loader._iter_documents())
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "2 rows" in str(e) and "1 lines" in str(e)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_placeholder_vectors_are_not_model_embeddings()
+    test_cloud_loader_reencodes_placeholder_vectors()
+    test_simple_loader_reencodes_placeholder_vectors()
+    test_simple_loader_rejects_mismatched_sidecars()
+    print("✅ Loader tests passed")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the RAG agent's Milvus reconnect and search paths
+"""
+import sys
+from unittest import mock
+sys.path.append('src')
+
+from agents import rag_agent
+from agents.rag_agent import RAGRetrieverAgent, SearchResult
+
+
+class _FakeHit:
+    id = 42
+    score = 0.9
+    entity = {"text": "Returns are accepted within 30 days.", "metadata": {"topic": "returns"}}
+
+
+class _FakeCollection:
+    def search(self, **kwargs):
+        return [[_FakeHit()]]
+
+
+def _dropped_agent():
+    """Agent that was connected once but has lost its collection after a failed reconnect"""
+    agent = RAGRetrieverAgent()
+    agent.milvus_connected = True
+    agent._connection_params = {"alias": "default", "host": "milvus.test", "port": "19530"}
+    agent.collection = None
+    return agent
+
+
+def test_search_retries_after_collection_dropped():
+    """A search rebuilds the collection instead of staying on the file fallback forever"""
+    agent = _dropped_agent()
+    fake_connections = mock.Mock()
+    fake_connections.has_connection.return_value = False
+    with mock.patch.object(rag_agent, "connections", fake_connections), \
+         mock.patch.object(agent, "_get_or_create_collection", return_value=_FakeCollection()):
+        results = agent.search_documents("return policy")
+    
+    fake_connections.connect.assert_called_once_with(**agent._connection_params)
+    assert isinstance(agent.collection, _FakeCollection)
+    assert [result.id for result in results] == [42]
+
+
+def test_reconnect_backs_off_then_recovers():
+    """A failed reconnect waits out the backoff, then the next attempt restores the collection"""
+    agent = _dropped_agent()
+    fake_connections = mock.Mock()
+    fake_connections.has_connection.return_value = False
+    fake_connections.connect.side_effect = [ConnectionError("server down"), None]
+    clock = mock.Mock(return_value=100.0)
+    with mock.patch.object(rag_agent, "connections", fake_connections), \
+         mock.patch.object(rag_agent.time, "monotonic", clock), \
+         mock.patch.object(agent, "_get_or_create_collection", return_value=_FakeCollection()):
+        assert not agent._ensure_connection()
+        assert agent._next_reconnect_at == 100.0 + rag_agent._RECONNECT_MIN_DELAY
+        
+        # Still inside the backoff window: no new connect attempt
+        clock.return_value = 100.5
+        assert not agent._ensure_connection()
+        assert fake_connections.connect.call_count == 1
+        
+        clock.return_value = 101.0
+        assert agent._ensure_connection()
+    
+    assert fake_connections.connect.call_count == 2
+    assert isinstance(agent.collection, _FakeCollection)
+    assert agent._reconnect_delay == rag_agent._RECONNECT_MIN_DELAY
+
+
+def test_full_text_fetched_only_for_milvus_snippets():
+    """File-fallback results keep their text; only Milvus snippet hits are expanded"""
+    agent = RAGRetrieverAgent()
+    agent.collection = mock.Mock()
+    agent.collection.query.return_value = [{"id": 7, "text": "full text"}]
+    results = [
+        SearchResult(id=7, text="snip", metadata={}, similarity_score=0.9, snippet=True),
+        SearchResult(id=1, text="file document", metadata={}, similarity_score=0.5),
+    ]
+    
+    expanded = agent._with_full_text(results)
+    
+    agent.collection.query.assert_called_once_with(expr="id in [7]", output_fields=["text"])
+    assert [result.text for result in expanded] == ["full text", "file document"]
+    
+    agent.collection.query.reset_mock()
+    assert agent._with_full_text(results[1:]) == results[1:]
+    agent.collection.query.assert_not_called()
+
+
+if __name__ == "__main__":
+    test_search_retries_after_collection_dropped()
+    test_reconnect_backs_off_then_recovers()
+    test_full_text_fetched_only_for_milvus_snippets()
+    print("✅ Reconnect tests passed")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the mock transactional agents
+"""
+import sys
+sys.path.append('src')
+
+from agents.transactional_agents import OrderStatusAgent, ProductAgent
+
+
+def _names(result):
+    return [product["name"] for product in result["data"]]
+
+
+def test_product_search_matches_partial_words():
+    """Queries that are not whole catalog words still find products by substring"""
+    agent = ProductAgent()
+    assert _names(agent.search_products("phone")) == ["Wireless Headphones", "Smartphone"]
+    assert _names(agent.search_products("head")) == ["Wireless Headphones"]
+
+
+def test_product_search_matches_whole_words():
+    """Whole-word queries use the token index, case-insensitively"""
+    agent = ProductAgent()
+    assert _names(agent.search_products("Headphones")) == ["Wireless Headphones"]
+    assert _names(agent.search_products("laptop")) == ["Gaming Laptop"]
+    assert _names(agent.search_products("no such product")) == []
+
+
+def test_product_search_results_are_copies():
+    """Mutating one search response does not leak into the next cached one"""
+    agent = ProductAgent()
+    first = agent.search_products("laptop")
+    first["data"][0]["price"] = 0
+    first["data"].clear()
+    assert agent.search_products("laptop")["data"][0]["price"] > 0
+
+
+def test_order_timeline_is_a_copy():
+    """Mutating a tracking response leaves the shared timeline templates intact"""
+    agent = OrderStatusAgent()
+    timeline = agent.track_order("ORD-001")["data"]["timeline"]
+    expected = [dict(step) for step in timeline]
+    timeline[0]["status"] = "tampered"
+    timeline.append({"step": "Lost"})
+    assert agent.track_order("ORD-001")["data"]["timeline"] == expected
+
+
+def test_order_items_are_a_copy():
+    """Mutating a status response leaves the shared mock order items intact"""
+    agent = OrderStatusAgent()
+    items = agent.get_order_status("ORD-001")["data"]["items"]
+    expected = [dict(item) for item in items]
+    items[0]["quantity"] = 99
+    items.append({"product": "Extra"})
+    assert agent.get_order_status("ORD-001")["data"]["items"] == expected
+
+
+if __name__ == "__main__":
+    test_product_search_matches_partial_words()
+    test_product_search_matches_whole_words()
+    test_product_search_results_are_copies()
+    test_order_timeline_is_a_copy()
+    test_order_items_are_a_copy()
+    print("✅ Transactional agent tests passed")